@@ -11,9 +11,45 @@
 # ERROR logs → Processed by ErrorLogger.
 # If one logger can’t handle it, it passes it to the next logger in the chain.
 
+# 🔹 Compiled Chain
+# Walking the chain costs one comparison per hop, so dispatch is linear in the chain length.
+# CompiledChain walks the linked next_logger chain once and builds a level -> handler table
+# (the first logger for a level wins, exactly as in the walk), so routing is one dict lookup.
+# Levels no logger handles fall through silently, like WARNING below. Call rebuild() after
+# changing the chain.
 
+# 🔹 Async Chain
+# AsyncChain routes like CompiledChain, but each concrete logger gets a BatchingHandler that
+# owns a bounded queue. The caller only enqueues the record, and a worker thread writes
+# records in batches, one write per batch. When a queue is full the backpressure policy
+# decides: "block" waits for room, "drop" discards the record, "spill" appends it to a file
+# on disk that the worker writes out once it has caught up. Until then new records are spilled
+# too, so they are written in the order they were logged.
 
+# 🔹 Multi-Process Aggregation
+# Worker processes don't print themselves. Each one appends serialized records to its own ring
+# in a multiprocessing.shared_memory segment, and a single LogAggregator drains the rings into
+# the chain. Every ring has exactly one writer and one reader, so no lock is needed: the writer
+# only moves the head, the reader only moves the tail, and each publishes its index after the
+# bytes it covers. Python has no memory barriers, so on weakly ordered CPUs (ARM) the reader may
+# see the new head before the record bytes. Each record therefore carries a CRC salted with its
+# position, and the reader stops at the first record that does not check out yet and retries it
+# on the next drain. When a ring is full the writer backs off; "block" gives up with TimeoutError
+# after timeout seconds and "drop" discards the record.
+
+
+
+import json
+import queue
+import struct
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from collections import deque
 from abc import ABC, abstractmethod
+from multiprocessing import Process, shared_memory
 
 # Abstract Logger
 class Logger(ABC):
@@ -27,34 +63,437 @@ class Logger(ABC):
         """Abstract log method to be implemented by subclasses"""
         pass
 
+    def write(self, message):
+        """Handles a record of this logger's level"""
+        print(f"[{self.level}] {message}")
+
+    def write_batch(self, messages):
+        """Handles several records of this logger's level with a single write"""
+        sys.stdout.write("".join(f"[{self.level}] {message}\n" for message in messages))
+        sys.stdout.flush()
+
 # Concrete Loggers
 class InfoLogger(Logger):
     """Handles INFO level logs, passes others to the next logger"""
+    level = "INFO"
 
     def log(self, level, message):
-        if level == "INFO":
-            print(f"[INFO] {message}")
+        if level == self.level:
+            self.write(message)
         elif self.next_logger:
             self.next_logger.log(level, message)  # Pass to the next logger
 
 class DebugLogger(Logger):
     """Handles DEBUG level logs, passes others to the next logger"""
+    level = "DEBUG"
 
     def log(self, level, message):
-        if level == "DEBUG":
-            print(f"[DEBUG] {message}")
+        if level == self.level:
+            self.write(message)
         elif self.next_logger:
             self.next_logger.log(level, message)  # Pass to the next logger
 
 class ErrorLogger(Logger):
     """Handles ERROR level logs, passes others to the next logger"""
+    level = "ERROR"
 
     def log(self, level, message):
-        if level == "ERROR":
-            print(f"[ERROR] {message}")
+        if level == self.level:
+            self.write(message)
         elif self.next_logger:
             self.next_logger.log(level, message)  # Pass to the next logger
 
+# Compiled Chain
+class CompiledChain:
+    """Routes records straight to their handler through a table built from the linked chain"""
+
+    def __init__(self, head):
+        self.head = head
+        self.rebuild()
+
+    def rebuild(self):
+        """Recompiles the table, call it after the chain changes"""
+        self._handlers = {}
+        self._fallback = None
+        logger = self.head
+        while logger is not None:
+            level = getattr(logger, "level", None)
+            if level is None:
+                # A logger without a declared level decides for itself, so anything not
+                # claimed earlier in the chain is handed to it and walks on from there.
+                self._fallback = logger
+                break
+            self._handlers.setdefault(level, logger)
+            logger = logger.next_logger
+
+    def log(self, level, message):
+        handler = self._handlers.get(level)
+        if handler is not None:
+            handler.write(message)
+        elif self._fallback is not None:
+            self._fallback.log(level, message)
+
+
+_STOP = object()
+
+
+# Batching Handler
+class BatchingHandler:
+    """Bounded queue in front of one logger, flushed in batches by a worker thread"""
+
+    POLICIES = ("block", "drop", "spill")
+
+    def __init__(self, logger, max_queue=10_000, batch_size=256, flush_interval=0.05, policy="block",
+                 latency_samples=4096):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown backpressure policy {policy!r}, expected one of {self.POLICIES}")
+        self.logger = logger
+        self.level = logger.level
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.policy = policy
+        self._queue = queue.Queue(max_queue)
+        self._spill_lock = threading.Lock()
+        self._spill_file = tempfile.TemporaryFile("w+", encoding="utf-8") if policy == "spill" else None
+        self._spill_pending = 0
+        self.dropped = 0
+        self.spilled = 0
+        self.written = 0
+        self.batches = 0
+        self.flush_latencies = deque(maxlen=latency_samples)  # Seconds per batch, most recent only
+        self._worker = threading.Thread(target=self._run, name=f"{self.level}-handler", daemon=True)
+        self._worker.start()
+
+    def write(self, message):
+        """Enqueues a record, applying the backpressure policy when the queue is full"""
+        if self.policy == "block":
+            self._queue.put(message)
+            return
+        if self.policy == "drop":
+            try:
+                self._queue.put_nowait(message)
+            except queue.Full:
+                self.dropped += 1
+            return
+        with self._spill_lock:
+            if not self._spill_pending:  # Once anything is spilled, newer records must follow it
+                try:
+                    self._queue.put_nowait(message)
+                    return
+                except queue.Full:
+                    pass
+            self._spill_file.write(json.dumps(message) + "\n")
+            self._spill_pending += 1
+            self.spilled += 1
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                batch = []
+            while batch and len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if batch and batch[-1] is _STOP:
+                batch.pop()
+                stopping = True
+            self._flush(batch)
+            if self._spill_pending and (self._queue.empty() or stopping):
+                self._flush(self._read_spill())
+
+    def _read_spill(self):
+        """Takes every spilled record back off the disk"""
+        with self._spill_lock:
+            self._spill_file.seek(0)
+            messages = [json.loads(line) for line in self._spill_file]
+            self._spill_file.seek(0)
+            self._spill_file.truncate()
+            self._spill_pending = 0
+        return messages
+
+    def _flush(self, messages):
+        for start in range(0, len(messages), self.batch_size):
+            batch = messages[start:start + self.batch_size]
+            started = time.perf_counter()
+            self.logger.write_batch(batch)
+            self.flush_latencies.append(time.perf_counter() - started)
+            self.batches += 1
+            self.written += len(batch)
+
+    def close(self):
+        """Writes out everything queued or spilled and stops the worker"""
+        self._queue.put(_STOP)
+        self._worker.join()
+        if self._spill_file is not None:
+            self._spill_file.close()
+
+    def stats(self):
+        latencies = sorted(self.flush_latencies)
+        return {
+            "queue_depth": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "spilled": self.spilled,
+            "batches": self.batches,
+            "flush_p50": latencies[len(latencies) // 2] if latencies else None,
+            "flush_p99": latencies[int(len(latencies) * 0.99) - 1] if latencies else None,
+        }
+
+
+class AsyncChain(CompiledChain):
+    """Compiled chain whose concrete loggers are fed through BatchingHandlers"""
+
+    def __init__(self, head, **handler_options):
+        self.handler_options = handler_options
+        self._handlers = {}
+        super().__init__(head)
+
+    def rebuild(self):
+        old_handlers = list(self._handlers.values())
+        super().rebuild()
+        self._handlers = {level: BatchingHandler(logger, **self.handler_options)
+                          for level, logger in self._handlers.items()}
+        for handler in old_handlers:
+            handler.close()
+
+    def close(self):
+        for handler in self._handlers.values():
+            handler.close()
+
+    def stats(self):
+        return {level: handler.stats() for level, handler in self._handlers.items()}
+
+
+# Shared-memory ring layout: [head u64][tail u64][data ...] per worker slot.
+# A record is [length u32][crc u32][level \0 message], padded to 8 bytes, where crc is the
+# CRC-32 of the record seeded with its position. A length of _WRAP followed by the position
+# means the rest of the ring is unused and the next record starts at offset 0.
+_RING_HEADER = 16
+_WRAP = 0xFFFFFFFF
+
+
+def _record_size(length):
+    return (8 + length + 7) & ~7
+
+
+class RingWriter:
+    """Producer side of one worker's ring, safe to pass to a worker process"""
+
+    POLICIES = ("block", "drop")
+
+    def __init__(self, name, slot, ring_bytes, policy="block", timeout=5.0):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown backpressure policy {policy!r}, expected one of {self.POLICIES}")
+        self.name = name
+        self.slot = slot
+        self.ring_bytes = ring_bytes
+        self.policy = policy
+        self.timeout = timeout  # Seconds "block" waits for room, None to wait forever
+        self.dropped = 0
+        self._shm = None
+
+    def __getstate__(self):
+        return {**self.__dict__, "_shm": None}
+
+    def _wait_for_room(self, buf, base, needed):
+        """Backs off until the aggregator frees needed bytes, False if the record should be dropped"""
+        capacity, delay, started = self.ring_bytes, 0.00005, None
+        while needed - struct.unpack_from("<Q", buf, base + 8)[0] > capacity:
+            if self.policy == "drop":
+                self.dropped += 1
+                return False
+            if started is None:
+                started = time.monotonic()
+            elif self.timeout is not None and time.monotonic() - started >= self.timeout:
+                raise TimeoutError(f"Ring {self.slot} stayed full for {self.timeout}s, is the aggregator draining?")
+            time.sleep(delay)
+            delay = min(delay * 2, 0.001)
+        return True
+
+    def log(self, level, message):
+        if self._shm is None:
+            self._shm = shared_memory.SharedMemory(self.name)
+        buf, capacity = self._shm.buf, self.ring_bytes
+        base = self.slot * (_RING_HEADER + capacity)
+        data = base + _RING_HEADER
+        record = f"{level}\0{message}".encode()
+        size = _record_size(len(record))
+        if size > capacity // 2:
+            raise ValueError(f"Record of {size} bytes does not fit a {capacity}-byte ring")
+        head = struct.unpack_from("<Q", buf, base)[0]
+        offset = head % capacity
+        padding = capacity - offset if offset + size > capacity else 0
+        if not self._wait_for_room(buf, base, head + padding + size):
+            return
+        if padding:
+            struct.pack_into("<II", buf, data + offset, _WRAP, head & 0xFFFFFFFF)
+            head, offset = head + padding, 0
+        struct.pack_into("<II", buf, data + offset, len(record), zlib.crc32(record, head & 0xFFFFFFFF))
+        buf[data + offset + 8:data + offset + 8 + len(record)] = record
+        struct.pack_into("<Q", buf, base, head + size)  # Publish after the bytes are written
+
+    def close(self):
+        if self._shm is not None:
+            self._shm.close()
+            self._shm = None
+
+
+class LogAggregator:
+    """Owns the shared-memory rings and feeds every worker's records into one chain"""
+
+    def __init__(self, chain, workers, ring_bytes=1 << 20):
+        self.chain = chain
+        self.workers = workers
+        self.ring_bytes = ring_bytes - ring_bytes % 8
+        self._shm = shared_memory.SharedMemory(create=True, size=workers * (_RING_HEADER + self.ring_bytes))
+        self._shm.buf[:] = bytes(len(self._shm.buf))
+        self.records = 0
+
+    def writer(self, slot, **options):
+        return RingWriter(self._shm.name, slot, self.ring_bytes, **options)
+
+    def drain(self):
+        """Feeds every record currently in the rings to the chain, returns how many"""
+        buf, capacity, drained = self._shm.buf, self.ring_bytes, 0
+        for slot in range(self.workers):
+            base = slot * (_RING_HEADER + capacity)
+            data = base + _RING_HEADER
+            head, tail = struct.unpack_from("<QQ", buf, base)
+            while tail < head:
+                offset = tail % capacity
+                length, check = struct.unpack_from("<II", buf, data + offset)
+                if length == _WRAP and check == tail & 0xFFFFFFFF:
+                    tail += capacity - offset
+                    continue
+                if 8 + length > min(capacity - offset, head - tail):
+                    break  # Header not visible yet, retry on the next drain
+                record = bytes(buf[data + offset + 8:data + offset + 8 + length])
+                if zlib.crc32(record, tail & 0xFFFFFFFF) != check:
+                    break  # Payload not visible yet (or a stale lap), retry on the next drain
+                level, _, message = record.decode().partition("\0")
+                self.chain.log(level, message)
+                tail += _record_size(length)
+                drained += 1
+            struct.pack_into("<Q", buf, base + 8, tail)  # Hand the space back to the writer
+        self.records += drained
+        return drained
+
+    def run(self, processes):
+        """Drains until every worker process has exited and the rings are empty"""
+        while any(process.is_alive() for process in processes):
+            if not self.drain():
+                time.sleep(0.0005)
+        for process in processes:
+            process.join()
+        self.drain()
+
+    def close(self):
+        self._shm.close()
+        self._shm.unlink()
+
+
+def _log_from_worker(writer, worker, records):
+    for i in range(records):
+        writer.log("ERROR" if i % 10 == 0 else "INFO", f"worker {worker} record {i}")
+    writer.close()
+
+
+def benchmark_aggregation(worker_counts=(1, 2, 4), records_per_worker=50_000):
+    """Aggregate records/sec fed into one chain as the number of worker processes grows"""
+
+    handled = [0]
+
+    class CountingInfoLogger(InfoLogger):
+        def write(self, message):
+            handled[0] += 1
+
+    class CountingErrorLogger(ErrorLogger):
+        def write(self, message):
+            handled[0] += 1
+
+    for workers in worker_counts:
+        handled[0] = 0
+        chain = CompiledChain(CountingInfoLogger(CountingErrorLogger()))
+        aggregator = LogAggregator(chain, workers)
+        processes = [Process(target=_log_from_worker, args=(aggregator.writer(slot), slot, records_per_worker))
+                     for slot in range(workers)]
+        started = time.perf_counter()
+        for process in processes:
+            process.start()
+        aggregator.run(processes)
+        elapsed = time.perf_counter() - started
+        aggregator.close()
+        print(f"{workers} worker(s): {aggregator.records / elapsed:,.0f} records/sec "
+              f"({handled[0]:,} handled)")
+
+
+def benchmark_dispatch(lengths=(3, 30, 300), records=20_000):
+    """Records/sec routed to the last logger of the chain: linked walk vs compiled table"""
+
+    class LevelLogger(Logger):
+        def __init__(self, level, next_logger=None):
+            super().__init__(next_logger)
+            self.level = level
+            self.handled = 0
+
+        def log(self, level, message):
+            if level == self.level:
+                self.write(message)
+            elif self.next_logger:
+                self.next_logger.log(level, message)
+
+        def write(self, message):
+            self.handled += 1  # Count instead of print, so only the routing is measured
+
+    for length in lengths:
+        head = None
+        for i in reversed(range(length)):
+            head = LevelLogger(f"LEVEL{i}", head)
+        last = f"LEVEL{length - 1}"
+        results = []
+        for chain in (head, CompiledChain(head)):
+            started = time.perf_counter()
+            for _ in range(records):
+                chain.log(last, "record")
+            results.append(records / (time.perf_counter() - started))
+        print(f"chain length {length:>3}: walk {results[0]:>12,.0f} rec/sec, compiled {results[1]:>12,.0f} rec/sec")
+
+
+def benchmark_async_chain(records=100_000, slow_write=0.001):
+    """Caller-side cost per record with a slow sink: synchronous chain vs AsyncChain"""
+
+    class SlowErrorLogger(ErrorLogger):
+        def write(self, message):
+            time.sleep(slow_write)
+
+        def write_batch(self, messages):
+            time.sleep(slow_write)  # One slow write per batch instead of per record
+
+    sync_records = records // 100
+    chain = CompiledChain(InfoLogger(SlowErrorLogger()))
+    started = time.perf_counter()
+    for i in range(sync_records):
+        chain.log("ERROR", f"record {i}")
+    sync_cost = (time.perf_counter() - started) / sync_records
+    print(f"sync        : {sync_cost * 1e6:8.1f} us/record on the caller")
+
+    for policy in BatchingHandler.POLICIES:
+        chain = AsyncChain(InfoLogger(SlowErrorLogger()), max_queue=10_000, policy=policy)
+        started = time.perf_counter()
+        for i in range(records):
+            chain.log("ERROR", f"record {i}")
+        caller_cost = (time.perf_counter() - started) / records
+        chain.close()
+        stats = chain.stats()["ERROR"]
+        print(f"async/{policy:<6}: {caller_cost * 1e6:8.1f} us/record on the caller, "
+              f"{stats['written']:,} written, {stats['dropped']:,} dropped, {stats['spilled']:,} spilled, "
+              f"flush p99 {stats['flush_p99'] * 1000:.2f}ms")
+
+
 # Client Code
 if __name__ == "__main__":
     # Create the chain: INFO → DEBUG → ERROR
@@ -68,5 +507,39 @@ if __name__ == "__main__":
     info_logger.log("ERROR", "System crash detected")  # Handled by ErrorLogger
     info_logger.log("WARNING", "Disk space low")  # Not handled
 
+    # Same chain, compiled into a level -> handler table
+    chain = CompiledChain(info_logger)
+    chain.log("ERROR", "System crash detected")  # Handled by ErrorLogger in one lookup
+    chain.log("WARNING", "Disk space low")  # Still not handled
+
+    print("\nDispatch benchmark:")
+    benchmark_dispatch()
+
+    # Async chain: callers only enqueue, the handlers write in batches
+    print()
+    async_chain = AsyncChain(info_logger, max_queue=2, policy="spill")
+    for i in range(5):
+        async_chain.log("ERROR", f"Disk failure #{i}")  # Records that don't fit spill to disk
+    async_chain.log("WARNING", "Disk space low")  # Still not handled
+    async_chain.close()
+    error_stats = async_chain.stats()["ERROR"]
+    print(f"ERROR handler: {error_stats['written']} written, {error_stats['spilled']} spilled, "
+          f"{error_stats['batches']} batches")
+
+    print("\nAsync chain benchmark:")
+    benchmark_async_chain()
+
+    # Worker processes log through shared memory, one aggregator prints through the chain
+    print()
+    aggregator = LogAggregator(info_logger, workers=2, ring_bytes=4096)
+    workers = [Process(target=_log_from_worker, args=(aggregator.writer(slot), slot, 3)) for slot in range(2)]
+    for worker in workers:
+        worker.start()
+    aggregator.run(workers)
+    aggregator.close()
+
+    print("\nAggregation benchmark:")
+    benchmark_aggregation()
+
 
 
@@ -7,7 +7,52 @@
 # ✔ You need to queue requests or log actions.
 # ✔ You want to support undo/redo operations.
 
+# 🔹 Gap Buffer
+# Appending with self.text += new_text copies the whole document on every write, and erasing
+# with a slice copies it again, so a long session is O(n^2). TextEditor keeps its text in a
+# GapBuffer instead: the characters before the cursor in one list and those after it, reversed,
+# in another. Edits at the cursor (appends, and the erases done by undo) are amortized O(1) per
+# character; an edit elsewhere first moves the gap, which costs the distance moved.
+
+# 🔹 Bounded History
+# CommandExecutor keeps its history as a ring buffer capped by command count and/or bytes, so
+# the oldest commands fall off instead of piling up for days. With coalesce_window set, a command
+# executed within that many seconds of the previous one is offered to it through merge(), so a
+# burst of typing becomes one WriteCommand. Undone commands go to a redo stack, which is cleared as soon
+# as a new command is executed.
+
+# 🔹 Durable Journal
+# CommandJournal is a write-ahead log of what commands did to their editors: compact binary
+# records [crc32][editor id][op][length][payload] appended to one file. With fsync="group",
+# concurrent executors that finish at the same time share a single fsync: the first caller
+# to need durability writes and syncs everything pending, and the others just wait for it.
+# Every snapshot_every records the editors' text is written to a snapshot file together with
+# the journal offset it covers, so recovery loads the snapshot and replays only the tail,
+# streaming it from an mmap of the journal. A torn record at the end is cut off.
+
+# 🔹 Concurrent Executor
+# Commands declare the resources (receivers) they touch through resources(). The
+# ConcurrentCommandExecutor runs a command on a thread pool as soon as every earlier command on
+# any of its resources has finished, so commands on different editors run in parallel while
+# commands on the same editor keep their order. A command that declares no resources is a
+# barrier: it waits for everything before it, and everything after it waits for it. Undo is
+# per receiver and is ordered like any other command on that receiver; each receiver keeps only
+# its last max_history commands. A command that raises is dropped from the undo histories (its
+# Future carries the error), and later commands on the same receivers still run.
+
+import contextlib
+import io
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+import tracemalloc
+import zlib
 from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 
 
 class Command(ABC):
@@ -21,63 +66,729 @@ class Command(ABC):
     def undo(self):
         pass
 
+    def merge(self, other):
+        """Absorbs an already executed command that follows this one, returns True on success"""
+        return False
+
+    def memory_size(self):
+        """Approximate bytes held by this command"""
+        return sys.getsizeof(self)
+
+    def resources(self):
+        """Receivers this command touches, () means it may touch anything"""
+        return ()
+
 class CommandExecutor:
-    def __init__(self):
-        self.history = []
+    def __init__(self, max_commands=None, max_bytes=None, coalesce_window=None, clock=time.monotonic):
+        self.history = deque()  # (command, executed_at, counted bytes), oldest first
+        self.redo_stack = []
+        self.max_commands = max_commands
+        self.max_bytes = max_bytes
+        self.coalesce_window = coalesce_window  # None never merges commands
+        self.clock = clock
+        self.history_bytes = 0  # Only tracked when max_bytes is set
 
     def execute(self, command):
         command.execute()
-        self.history.append(command)
+        self.redo_stack.clear()  # A new command invalidates everything that was undone
+        now = self.clock()
+        if (self.coalesce_window is not None and self.history
+                and now - self.history[-1][1] <= self.coalesce_window):
+            last, _, counted = self.history[-1]
+            if last.merge(command):
+                self.history.pop()
+                self.history_bytes -= counted
+                self._push(last, now)
+                return
+        self._push(command, now)
+
+    def _push(self, command, executed_at):
+        # The size is counted once here; a command's memory_size() may change later (e.g. on a read)
+        size = command.memory_size() if self.max_bytes is not None else 0
+        self.history.append((command, executed_at, size))
+        self.history_bytes += size
+        self._trim()
+
+    def _trim(self):
+        """Drops the oldest commands until the history fits its caps"""
+        if self.max_commands is not None:
+            while len(self.history) > self.max_commands:
+                self._drop_oldest()
+        if self.max_bytes is not None:
+            while self.history and self.history_bytes > self.max_bytes:
+                self._drop_oldest()
+
+    def _drop_oldest(self):
+        _, _, counted = self.history.popleft()
+        self.history_bytes -= counted
+
+    def memory_size(self):
+        """Approximate bytes held by the undo and redo history"""
+        return sum(command.memory_size() for command, _, _ in self.history) + \
+            sum(command.memory_size() for command in self.redo_stack)
 
     def undo(self):
         if self.history:
             print("Undoing last command...")
-            command = self.history.pop()
+            command, _, counted = self.history.pop()
+            self.history_bytes -= counted
             command.undo()
+            self.redo_stack.append(command)
         else:
             print("Nothing to undo!")
 
+    def redo(self):
+        if self.redo_stack:
+            print("Redoing last command...")
+            command = self.redo_stack.pop()
+            command.execute()
+            self._push(command, float("-inf"))  # Never merged with the next command
+        else:
+            print("Nothing to redo!")
+
+class GapBuffer:
+    """Text store with a movable gap: characters before it, and the ones after it reversed"""
+
+    def __init__(self, text=""):
+        self._before = list(text)
+        self._after = []
+
+    def __len__(self):
+        return len(self._before) + len(self._after)
+
+    def _move_gap(self, position):
+        if position < len(self._before):
+            moved = self._before[position:]
+            del self._before[position:]
+            self._after.extend(reversed(moved))
+        elif position > len(self._before):
+            count = position - len(self._before)
+            self._before.extend(reversed(self._after[-count:]))
+            del self._after[-count:]
+
+    def insert(self, position, text):
+        self._move_gap(position)
+        self._before.extend(text)
+
+    def delete(self, position, length):
+        self._move_gap(position + length)
+        del self._before[position:]
+
+    def append(self, text):
+        self.insert(len(self), text)
+
+    def erase(self, length):
+        """Removes the last length characters"""
+        start = max(0, len(self) - length)
+        self.delete(start, len(self) - start)
+
+    def __str__(self):
+        return "".join(self._before) + "".join(reversed(self._after))
+
+
 # Concrete Command for Undo/Redo
 class TextEditor:
     def __init__(self):
-        self.text = ""
+        self._buffer = GapBuffer()
+
+    @property
+    def text(self):
+        return str(self._buffer)
 
     def write(self, new_text):
-        self.text += new_text
+        self._buffer.append(new_text)
         # print(f"Text: {self.text}")
 
     def erase(self, length):
-        self.text = self.text[:-length]
+        self._buffer.erase(length)
         # print(f"Text after undo: {self.text}")
 
+    def insert(self, position, new_text):
+        self._buffer.insert(position, new_text)
+
+    def delete(self, position, length):
+        self._buffer.delete(position, length)
+
     def display(self):
         print(f"Text: {self.text}")
 
 class WriteCommand(Command):
     def __init__(self, editor, text):
         self.editor = editor
-        self.text = text
+        self._parts = [text]  # Merged writes, joined only when the text is read
+        self._length = len(text)
+
+    @property
+    def text(self):
+        if len(self._parts) > 1:
+            self._parts = ["".join(self._parts)]
+        return self._parts[0]
 
     def execute(self):
         self.editor.write(self.text)
 
     def undo(self):
-        self.editor.erase(len(self.text))
+        self.editor.erase(self._length)
+
+    def merge(self, other):
+        if not isinstance(other, WriteCommand) or other.editor is not self.editor:
+            return False
+        self._parts.extend(other._parts)
+        self._length += other._length
+        return True
+
+    def memory_size(self):
+        return sys.getsizeof(self) + sys.getsizeof(self._parts) + sum(sys.getsizeof(part) for part in self._parts)
+
+    def resources(self):
+        return (self.editor,)
+
+    def journal_entry(self):
+        return _WRITE, self.text.encode()
+
+    def undo_journal_entry(self):
+        return _ERASE, struct.pack("<Q", self._length)
+
+
+# Journal records: what a command did to an editor
+_WRITE = 1  # payload: utf-8 text appended
+_ERASE = 2  # payload: u64 number of characters erased from the end
+_RECORD_HEADER = struct.Struct("<IIBI")  # crc32, editor id, op, payload length
+_SNAPSHOT_HEADER = struct.Struct("<QI")  # journal offset covered, number of editors
+_SNAPSHOT_EDITOR = struct.Struct("<IQ")  # editor id, text bytes
+
+
+class CommandJournal:
+    """Append-only binary journal with group-commit fsync and periodic snapshots
+
+    fsync policies:
+        "group"     execute() returns once its record is fsynced; concurrent callers share fsyncs
+        "interval"  a background thread writes and fsyncs every interval seconds
+        "none"      records are written out in large batches and never fsynced
+
+    A failed write or fsync leaves the journal failed: the leader and every waiter raise, and so
+    does every later call, because after a failed fsync nobody can tell what reached the disk.
+    """
+
+    FSYNC_POLICIES = ("group", "interval", "none")
+
+    def __init__(self, path, fsync="group", interval=0.01, snapshot_every=None):
+        if fsync not in self.FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy {fsync!r}, expected one of {self.FSYNC_POLICIES}")
+        self.path = path
+        self.snapshot_path = path + ".snapshot"
+        self.fsync = fsync
+        self.snapshot_every = snapshot_every
+        self._file = open(path, "ab")
+        self._lock = threading.Lock()
+        self._synced = threading.Condition(self._lock)
+        self._pending = []  # Encoded records not written yet
+        self._appended = 0  # Sequence number of the last record appended
+        self._durable = 0  # Sequence number of the last record written (and fsynced, unless "none")
+        self._flushing = False
+        self._error = None  # The write or fsync failure that broke the journal
+        self._since_snapshot = 0
+        self._editors = {}  # editor id -> TextEditor
+        self.fsyncs = 0
+        self._closed = threading.Event()
+        if fsync == "interval":
+            self._flusher = threading.Thread(target=self._flush_periodically, args=(interval,), daemon=True)
+            self._flusher.start()
+
+    def register(self, editor, editor_id=None):
+        """Starts journaling an editor, returns its id in the journal"""
+        with self._lock:
+            if editor_id is None:
+                editor_id = max(self._editors, default=-1) + 1
+            self._editors[editor_id] = editor
+        return editor_id
+
+    def record(self, editor_id, op, payload, apply):
+        """Runs apply() and appends its record atomically, then waits as the fsync policy says"""
+        crc = zlib.crc32(payload, zlib.crc32(bytes((op,)), editor_id))
+        with self._lock:
+            self._check()
+            apply()
+            self._pending.append(_RECORD_HEADER.pack(crc, editor_id, op, len(payload)) + payload)
+            self._appended += 1
+            seq = self._appended
+            self._since_snapshot += 1
+            if self.snapshot_every is not None and self._since_snapshot >= self.snapshot_every:
+                self._snapshot()
+            elif self.fsync == "none" and len(self._pending) >= 4096:
+                self._write_pending(sync=False)
+        if self.fsync == "group":
+            self.sync(seq)
+        return seq
+
+    def sync(self, seq=None):
+        """Blocks until record seq (default: everything appended) is durable"""
+        with self._lock:
+            seq = self._appended if seq is None else seq
+            while self._durable < seq:
+                self._check()
+                if self._flushing:
+                    self._synced.wait()  # Someone else's fsync may cover this record too
+                    continue
+                # Become the leader: take everything pending and sync it for all waiters
+                self._flushing = True
+                batch, self._pending = self._pending, []
+                upto = self._appended
+                self._lock.release()
+                try:
+                    self._file.write(b"".join(batch))
+                    self._file.flush()
+                    if self.fsync != "none":
+                        os.fsync(self._file.fileno())
+                        self.fsyncs += 1
+                except BaseException as error:
+                    self._lock.acquire()
+                    self._error = error  # Waiters wake up and raise instead of reporting durability
+                    raise
+                else:
+                    self._lock.acquire()
+                    self._durable = upto
+                finally:
+                    self._flushing = False
+                    self._synced.notify_all()
+
+    def _check(self):
+        """Raises if an earlier write or fsync failed, called with the lock held"""
+        if self._error is not None:
+            raise OSError(f"Journal {self.path} failed, its records may not be durable") from self._error
+
+    def _write_pending(self, sync):
+        """Writes out pending records, called with the lock held"""
+        while self._flushing:
+            self._synced.wait()
+        self._check()
+        try:
+            self._file.write(b"".join(self._pending))
+            self._pending = []
+            self._file.flush()
+            if sync:
+                os.fsync(self._file.fileno())
+                self.fsyncs += 1
+        except BaseException as error:
+            self._error = error
+            raise
+        self._durable = self._appended
+
+    def _flush_periodically(self, interval):
+        while not self._closed.wait(interval):
+            self.sync()
+
+    def _snapshot(self):
+        """Writes every editor's text and the journal offset it covers, called with the lock held"""
+        self._write_pending(sync=self.fsync != "none")
+        offset = self._file.tell()
+        temporary = self.snapshot_path + ".tmp"
+        with open(temporary, "wb") as snapshot:
+            snapshot.write(_SNAPSHOT_HEADER.pack(offset, len(self._editors)))
+            for editor_id, editor in self._editors.items():
+                text = editor.text.encode()
+                snapshot.write(_SNAPSHOT_EDITOR.pack(editor_id, len(text)))
+                snapshot.write(text)
+            snapshot.flush()
+            if self.fsync != "none":
+                os.fsync(snapshot.fileno())
+        os.replace(temporary, self.snapshot_path)
+        self._since_snapshot = 0
+
+    def close(self):
+        self._closed.set()
+        self.sync()
+        self._file.close()
+
+    @staticmethod
+    def recover(path):
+        """Rebuilds {editor id: TextEditor} from the latest snapshot plus the journal tail"""
+        editors, offset = {}, 0
+        if os.path.exists(path + ".snapshot"):
+            with open(path + ".snapshot", "rb") as snapshot:
+                offset, count = _SNAPSHOT_HEADER.unpack(snapshot.read(_SNAPSHOT_HEADER.size))
+                for _ in range(count):
+                    editor_id, length = _SNAPSHOT_EDITOR.unpack(snapshot.read(_SNAPSHOT_EDITOR.size))
+                    editors[editor_id] = TextEditor()
+                    editors[editor_id].write(snapshot.read(length).decode())
+        if not os.path.exists(path) or os.path.getsize(path) <= offset:
+            return editors
+        with open(path, "r+b") as journal:
+            with mmap.mmap(journal.fileno(), 0, access=mmap.ACCESS_READ) as log:
+                end = len(log)
+                while offset + _RECORD_HEADER.size <= end:
+                    crc, editor_id, op, length = _RECORD_HEADER.unpack_from(log, offset)
+                    start = offset + _RECORD_HEADER.size
+                    payload = log[start:start + length]
+                    if len(payload) < length or zlib.crc32(payload, zlib.crc32(bytes((op,)), editor_id)) != crc:
+                        break  # Torn or corrupt tail, everything before it is intact
+                    editor = editors.get(editor_id)
+                    if editor is None:
+                        editor = editors[editor_id] = TextEditor()
+                    if op == _WRITE:
+                        editor.write(payload.decode())
+                    else:
+                        editor.erase(struct.unpack("<Q", payload)[0])
+                    offset = start + length
+            journal.truncate(offset)
+        return editors
+
+
+class JournaledExecutor(CommandExecutor):
+    """CommandExecutor that journals every effect on its editor before returning"""
+
+    def __init__(self, journal, editor, editor_id=None, **options):
+        super().__init__(**options)
+        self.journal = journal
+        self.editor_id = journal.register(editor, editor_id)
+
+    def execute(self, command):
+        self.journal.record(self.editor_id, *command.journal_entry(),
+                            apply=lambda: CommandExecutor.execute(self, command))
+
+    def undo(self):
+        if not self.history:
+            return super().undo()
+        command = self.history[-1][0]
+        self.journal.record(self.editor_id, *command.undo_journal_entry(),
+                            apply=lambda: CommandExecutor.undo(self))
+
+    def redo(self):
+        if not self.redo_stack:
+            return super().redo()
+        command = self.redo_stack[-1]
+        self.journal.record(self.editor_id, *command.journal_entry(),
+                            apply=lambda: CommandExecutor.redo(self))
+
+class _UndoCommand(Command):
+    """Schedules a command's undo behind everything already submitted on its resources"""
+
+    def __init__(self, command):
+        self.command = command
+
+    def execute(self):
+        self.command.undo()
+
+    def undo(self):
+        self.command.execute()
+
+    def resources(self):
+        return self.command.resources()
+
+
+class ConcurrentCommandExecutor:
+    """Runs commands on a thread pool, ordered only against commands on the same resources"""
+
+    def __init__(self, max_workers=8, max_history=1000):
+        self._pool = ThreadPoolExecutor(max_workers)
+        self.max_history = max_history
+        self._lock = threading.RLock()  # Done callbacks may run inline while it is held
+        self._last = {}  # resource -> Future of the last command submitted on it
+        self._barrier = None  # Future of the last command with no declared resources
+        self._outstanding = set()  # Futures not done yet
+        self.histories = {}  # resource -> deque of the last max_history commands on it, oldest first
+        self._failed = set()  # Failed commands whose undo was already scheduled, so it must do nothing
+
+    def execute(self, command):
+        """Submits a command, returns a Future that completes when it has run"""
+        with self._lock:
+            for resource in command.resources():
+                history = self.histories.get(resource)
+                if history is None:
+                    history = self.histories[resource] = deque(maxlen=self.max_history)
+                history.append(command)
+            return self._schedule(command)
+
+    def undo(self, resource):
+        """Undoes the last command submitted on resource, after everything before it has run"""
+        with self._lock:
+            history = self.histories.get(resource)
+            if not history:
+                print("Nothing to undo!")
+                return None
+            command = history[-1]
+            for other in command.resources():  # Check everything before changing anything
+                if other is not resource and not (self.histories.get(other) and self.histories[other][-1] is command):
+                    raise RuntimeError("Undo would skip a later command on another resource of this command")
+            for other in command.resources():
+                self.histories[other].pop()
+            return self._schedule(_UndoCommand(command))
+
+    def _schedule(self, command):
+        """Works out what the command has to wait for, called with the lock held"""
+        future = Future()
+        resources = command.resources()
+        if resources:
+            dependencies = {self._last[resource] for resource in resources if resource in self._last}
+            if self._barrier is not None:
+                dependencies.add(self._barrier)
+            for resource in resources:
+                self._last[resource] = future
+        else:
+            dependencies = set(self._outstanding)
+            self._barrier = future
+            self._last.clear()
+        dependencies = {dependency for dependency in dependencies if not dependency.done()}
+        self._outstanding.add(future)
+        future.add_done_callback(self._finished)
+
+        remaining = [len(dependencies)]
+
+        def dependency_done(_):
+            with self._lock:
+                remaining[0] -= 1
+                ready = remaining[0] == 0
+            if ready:
+                self._pool.submit(self._run, command, future)
+
+        if not dependencies:
+            self._pool.submit(self._run, command, future)
+        for dependency in dependencies:
+            dependency.add_done_callback(dependency_done)
+        return future
+
+    def _run(self, command, future):
+        if isinstance(command, _UndoCommand):
+            with self._lock:
+                if command.command in self._failed:
+                    self._failed.discard(command.command)  # Nothing was done, so nothing to undo
+                    future.set_result(None)
+                    return
+        try:
+            command.execute()
+        except BaseException as error:
+            if not isinstance(command, _UndoCommand):
+                self._forget_failed(command)
+            future.set_exception(error)
+        else:
+            future.set_result(None)
+
+    def _forget_failed(self, command):
+        """Keeps a command that raised out of undo"""
+        with self._lock:
+            found = False
+            for resource in command.resources():
+                history = self.histories.get(resource)
+                if history is not None and command in history:
+                    history.remove(command)
+                    found = True
+            if not found and command.resources():
+                self._failed.add(command)  # undo() already took it, its undo is scheduled
+
+    def _finished(self, future):
+        with self._lock:
+            self._outstanding.discard(future)
+            if self._barrier is future:
+                self._barrier = None
+            for resource, last in list(self._last.items()):
+                if last is future:
+                    del self._last[resource]
+
+    def wait(self):
+        """Blocks until everything submitted so far has run"""
+        while True:
+            with self._lock:
+                outstanding = list(self._outstanding)
+            if not outstanding:
+                return
+            for future in outstanding:
+                future.exception()
+
+    def shutdown(self):
+        self.wait()
+        self._pool.shutdown()
+
+
+def benchmark_concurrent_executor(editors=64, commands_per_editor=50, latency=0.001, workers=32):
+    """Throughput with many independent receivers whose commands wait on I/O"""
+
+    class RemoteWriteCommand(WriteCommand):
+        def execute(self):
+            time.sleep(latency)  # e.g. the receiver persists the edit somewhere
+            super().execute()
+
+    workload = [(editor, i) for i in range(commands_per_editor) for editor in range(editors)]
+    total = len(workload)
+
+    receivers = [TextEditor() for _ in range(editors)]
+    executor = CommandExecutor()
+    started = time.perf_counter()
+    for editor, i in workload:
+        executor.execute(RemoteWriteCommand(receivers[editor], f"{i} "))
+    print(f"serial    : {total / (time.perf_counter() - started):>9,.0f} commands/sec")
+
+    receivers = [TextEditor() for _ in range(editors)]
+    executor = ConcurrentCommandExecutor(workers)
+    started = time.perf_counter()
+    for editor, i in workload:
+        executor.execute(RemoteWriteCommand(receivers[editor], f"{i} "))
+    executor.shutdown()
+    elapsed = time.perf_counter() - started
+    in_order = all(receiver.text == "".join(f"{i} " for i in range(commands_per_editor)) for receiver in receivers)
+    print(f"concurrent: {total / elapsed:>9,.0f} commands/sec ({workers} threads, per-editor order kept: {in_order})")
+
+
+def benchmark_writes(writes=1_000_000, undo_every=10, string_writes=50_000):
+    """Small writes with an undo every undo_every writes: string editor vs gap buffer"""
+
+    class StringTextEditor:
+        def __init__(self):
+            self.text = ""
+
+        def write(self, new_text):
+            self.text += new_text
+
+        def erase(self, length):
+            self.text = self.text[:-length]
+
+    for label, editor, count in (("string", StringTextEditor(), string_writes),
+                                 ("gap buffer", TextEditor(), writes)):
+        executor = CommandExecutor()
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i in range(count):
+                executor.execute(WriteCommand(editor, "word "))
+                if i % undo_every == undo_every - 1:
+                    executor.undo()
+        elapsed = time.perf_counter() - started
+        print(f"{label:>10}: {count:,} writes in {elapsed:.2f}s ({count / elapsed:,.0f} writes/sec, "
+              f"{len(editor.text):,} chars)")
+
+
+def benchmark_history_memory(writes=100_000, burst=20):
+    """History memory over a long typing session: unbounded vs bounded and coalescing"""
+    tick = [0.0]
+
+    def clock():
+        return tick[0]
+
+    for label, options in (("unbounded", {}),
+                           ("max_commands=1000", {"max_commands": 1_000, "coalesce_window": 1.0}),
+                           ("max_bytes=64KB", {"max_bytes": 64 * 1024, "coalesce_window": 1.0})):
+        editor = TextEditor()
+        executor = CommandExecutor(clock=clock, **options)
+        tracemalloc.start()
+        for i in range(writes):
+            tick[0] += 0.1 if i % burst else 10.0  # Bursts of typing separated by pauses
+            command = WriteCommand(editor, "word ")
+            executor.execute(command)
+        del command
+        editor._buffer = GapBuffer()  # Leave only the history traced
+        history_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print(f"{label:>17}: {len(executor.history):>7,} commands, history {history_bytes / 1e6:6.2f} MB traced")
+
+
+def benchmark_journal(commands=20_000, threads=(1, 8), recovery_commands=1_000_000):
+    """Commands/sec per fsync policy and thread count, then recovery time of a long journal"""
+    import tempfile
+    from concurrent.futures import ThreadPoolExecutor
+
+    def session(journal, editor_id, count):
+        editor = TextEditor()
+        executor = JournaledExecutor(journal, editor, editor_id)
+        for i in range(count):
+            executor.execute(WriteCommand(editor, "word "))
+            if i % 10 == 9:
+                executor.undo()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for fsync in CommandJournal.FSYNC_POLICIES:
+            for thread_count in threads:
+                path = os.path.join(directory, f"{fsync}-{thread_count}.journal")
+                journal = CommandJournal(path, fsync=fsync)
+                count = commands // thread_count if fsync != "group" else commands // 10 // thread_count
+                started = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(thread_count) as pool:
+                    list(pool.map(lambda editor_id: session(journal, editor_id, count), range(thread_count)))
+                journal.close()
+                elapsed = time.perf_counter() - started
+                total = count * thread_count * 11 // 10
+                print(f"fsync={fsync:<8} threads={thread_count}: {total / elapsed:>9,.0f} records/sec, "
+                      f"{journal.fsyncs:,} fsyncs")
+
+        for snapshot_every in (None, recovery_commands // 10):
+            path = os.path.join(directory, f"recovery-{snapshot_every}.journal")
+            journal = CommandJournal(path, fsync="none", snapshot_every=snapshot_every)
+            with contextlib.redirect_stdout(io.StringIO()):
+                session(journal, 0, recovery_commands * 10 // 11)
+            journal.close()
+            started = time.perf_counter()
+            editors = CommandJournal.recover(path)
+            elapsed = time.perf_counter() - started
+            print(f"recover {recovery_commands:,} records, snapshot_every={snapshot_every}: {elapsed:.2f}s "
+                  f"({len(editors[0].text):,} chars)")
+
 
 # Client Code
-editor = TextEditor()
-cmd1 = WriteCommand(editor, "Hello ")
-cmd2 = WriteCommand(
-    , "World!")
+if __name__ == "__main__":
+    editor = TextEditor()
+    cmd1 = WriteCommand(editor, "Hello ")
+    cmd2 = WriteCommand(editor, "World!")
+
+    executor = CommandExecutor()
+
+    executor.execute(cmd1)  # Output: Text: Hello
+    executor.execute(cmd2)  # Output: Text: Hello World!
+    editor.display()
+
+    executor.undo()  # Undo last action -> Output: Text after undo: Hello
+    editor.display()
+
+    # history.undo()  # Undo again -> Output: Text after undo: (empty)
+    # history.undo()  # Nothing left to undo
+
+    # Positional edits move the gap instead of copying the document
+    editor.insert(0, ">> ")
+    editor.delete(3, 1)
+    editor.display()  # Output: Text: >> ello
+
+    print("\nWrite benchmark:")
+    benchmark_writes()
+
+    # Bounded history: quick consecutive writes are merged, undone commands can be redone
+    editor = TextEditor()
+    executor = CommandExecutor(max_commands=100, coalesce_window=1.0)
+    for word in ("Hello", ", ", "World"):
+        executor.execute(WriteCommand(editor, word))  # Merged into one command
+    print(f"\nHistory holds {len(executor.history)} command(s)")
+    executor.undo()
+    editor.display()  # Output: Text:
+    executor.redo()
+    editor.display()  # Output: Text: Hello, World
+
+    print("\nHistory memory benchmark:")
+    benchmark_history_memory()
 
-executor = CommandExecutor()
+    # Journaled executor: a crash loses nothing that execute() has returned from
+    import tempfile
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "editor.journal")
+        journal = CommandJournal(path, fsync="group", snapshot_every=2)
+        editor = TextEditor()
+        executor = JournaledExecutor(journal, editor)
+        for word in ("Hello", ", ", "World", "!"):
+            executor.execute(WriteCommand(editor, word))
+        executor.undo()
+        journal.close()
+        recovered = CommandJournal.recover(path)[executor.editor_id]
+        print("\nRecovered from journal:", end=" ")
+        recovered.display()  # Output: Text: Hello, World
 
-executor.execute(cmd1)  # Output: Text: Hello
-executor.execute(cmd2)  # Output: Text: Hello World!
-editor.display()
+    print("\nJournal benchmark:")
+    benchmark_journal()
 
-executor.undo()  # Undo last action -> Output: Text after undo: Hello
-editor.display()
+    # Concurrent executor: different editors in parallel, each editor in order
+    left, right = TextEditor(), TextEditor()
+    executor = ConcurrentCommandExecutor()
+    for word in ("Hello", " ", "left"):
+        executor.execute(WriteCommand(left, word))
+        executor.execute(WriteCommand(right, word.replace("left", "right")))
+    executor.undo(right)  # Undoes only the last command on the right editor
+    executor.shutdown()
+    print()
+    left.display()  # Output: Text: Hello left
+    right.display()  # Output: Text: Hello
 
-# history.undo()  # Undo again -> Output: Text after undo: (empty)
-# history.undo()  # Nothing left to undo
+    print("\nConcurrent executor benchmark:")
+    benchmark_concurrent_executor()
@@ -5,8 +5,57 @@
 # ✅ Scalability → New users can be added without modifying existing users.
 # ✅ Centralized Communication → The ChatRoom handles message distribution, reducing dependencies.
 
+# 🔹 Async Chat Room
+# ChatRoom calls every receiver in turn on the sender's thread, so one slow receiver stalls the
+# whole room. AsyncChatRoom gives every user a bounded inbox drained by its own delivery task:
+# sending only enqueues, receivers run concurrently, and a full inbox is handled by the user's
+# overflow policy ("drop_oldest", "drop_newest" or "block", which makes the sender wait).
 
+# 🔹 Sharded Chat Mediator
+# One room process uses one core. ShardedChatMediator spreads rooms and user mailboxes over
+# worker processes with a consistent hash ring. A room's shard fans a message out, and hands
+# the deliveries for users that live on other shards straight to those shards over unix
+# sockets. Adding a worker only moves the rooms and mailboxes the ring now assigns to it.
+# Each mailbox keeps the newest mailbox_size (sender, message) pairs until its ShardedUser
+# collects them with check_messages(), which calls receive_message() like any other colleague.
+
+# 🔹 Encode-Once Broadcast
+# BroadcastChatRoom serializes a message once into an immutable bytes payload and hands every
+# recipient the same read-only memoryview of it, instead of each recipient formatting and
+# encoding its own copy. A SocketUser only queues the views it receives; flush() writes all of
+# them with one vectored sendmsg() call, so several messages cost one syscall per recipient.
+# Batching only caps latency: the room flushes after flush_every messages or max_delay seconds,
+# whichever comes first. On a non-blocking socket whatever does not fit stays queued and is
+# retried after another max_delay.
+
+# 🔹 Chat History
+# ChatHistoryStore keeps every room's messages in append-only segment files. Every
+# index_interval-th record goes into a sparse (seq, timestamp, offset) index kept next to the
+# segment, so "last N messages" and "messages since T" bisect the index and read at most
+# index_interval records from an mmap of the segment. A segment is rolled once it reaches
+# segment_bytes, and retention deletes whole old segments. HistoryChatRoom records what it
+# delivers, so late joiners can scroll back.
+
+
+import asyncio
+import hashlib
+import math
+import mmap
+import os
+import queue
+import shutil
+import socket
+import struct
+import tempfile
+import threading
+import time
+import tracemalloc
 from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect, bisect_left, bisect_right
+from collections import deque
+from multiprocessing import Pipe, Process
+from multiprocessing.connection import Client, Listener
 
 # Mediator Interface
 class ChatMediator(ABC):
@@ -57,6 +106,858 @@ class User:
         """User receives a message"""
         print(f"📩 {self.name} received from {sender.name}: {message}")
 
+# Encode-Once Concrete Mediator
+class BroadcastChatRoom(ChatRoom):
+    """Encodes each message once and shares one read-only memoryview with all recipients"""
+
+    def __init__(self, flush_every=32, max_delay=0.005):
+        super().__init__()
+        self.flush_every = flush_every  # Messages queued before every recipient is flushed
+        self.max_delay = max_delay  # Longest a queued message waits for a flush, None to flush by hand
+        self._unflushed = 0
+        self._lock = threading.RLock()  # The delay timer flushes from its own thread
+        self._timer = None
+
+    def send_message(self, message, sender):
+        """Send a message to all users except the sender"""
+        with self._lock:
+            payload = None
+            for user in self.users:
+                if user == sender:
+                    continue
+                receive_payload = getattr(user, "receive_payload", None)
+                if receive_payload is None:
+                    user.receive_message(message, sender)  # Plain users still get the message itself
+                    continue
+                if payload is None:
+                    payload = memoryview(f"{sender.name}: {message}\n".encode())
+                receive_payload(payload, sender)
+            self._unflushed += 1
+            if self._unflushed >= self.flush_every:
+                self.flush()
+            else:
+                self._arm_timer()
+
+    def _arm_timer(self):
+        """Schedules a flush max_delay from now unless one is pending, called with the lock held"""
+        if self._timer is None and self.max_delay is not None:
+            self._timer = threading.Timer(self.max_delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """Writes out everything the recipients have queued"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            backlog = False
+            for user in self.users:
+                flush = getattr(user, "flush", None)
+                if flush is not None and flush() is False:
+                    backlog = True  # Socket full, try again later
+            self._unflushed = 0
+            if backlog:
+                self._arm_timer()
+
+
+_IOV_MAX = os.sysconf("SC_IOV_MAX") if hasattr(os, "sysconf") else 1024
+
+
+# Colleague connected over a socket
+class SocketUser(User):
+    """User whose messages go to a socket, several per vectored send"""
+
+    def __init__(self, name, chat_mediator, sock):
+        self.sock = sock
+        self._outgoing = []  # memoryviews not sent yet
+        super().__init__(name, chat_mediator)
+
+    def receive_payload(self, payload, sender):
+        """Queues an already encoded message without copying it"""
+        self._outgoing.append(payload)
+
+    def receive_message(self, message, sender):
+        self.receive_payload(memoryview(f"{sender.name}: {message}\n".encode()), sender)
+
+    def flush(self):
+        """Sends what the socket takes now, returns True once nothing is left queued"""
+        outgoing = self._outgoing
+        while outgoing:
+            try:
+                sent = self.sock.sendmsg(outgoing[:_IOV_MAX])
+            except (BlockingIOError, InterruptedError):
+                return False  # Socket buffer full: the rest stays queued for the next flush()
+            done = 0
+            while done < len(outgoing) and sent >= len(outgoing[done]):
+                sent -= len(outgoing[done])
+                done += 1
+            del outgoing[:done]
+            if sent:
+                outgoing[0] = outgoing[0][sent:]  # Partially sent, keep the rest (a view, not a copy)
+        return True
+
+
+def benchmark_broadcast(recipients=200, messages=32, size=1024):
+    """Bytes allocated and CPU per broadcast: encode per recipient vs encode once"""
+
+    class EncodingSocketUser(User):
+        """Formats and encodes its own copy, one send per message"""
+
+        def __init__(self, name, chat_mediator, sock):
+            self.sock = sock
+            self._outgoing = []
+            super().__init__(name, chat_mediator)
+
+        def receive_message(self, message, sender):
+            self._outgoing.append(f"{sender.name}: {message}\n".encode())
+
+        def flush(self):
+            for data in self._outgoing:
+                self.sock.sendall(data)
+            self._outgoing.clear()
+
+    message = "x" * size
+    for label, room_class, user_class in (("encode per recipient", ChatRoom, EncodingSocketUser),
+                                          ("encode once", BroadcastChatRoom, SocketUser)):
+        pairs = [socket.socketpair() for _ in range(recipients + 1)]
+        room = room_class() if room_class is ChatRoom else room_class(flush_every=messages + 1, max_delay=None)
+        users = [user_class(f"user{i}", room, ours) for i, (ours, _) in enumerate(pairs)]
+        sender = users[0]
+
+        def broadcast():
+            for _ in range(messages):
+                room.send_message(message, sender)
+
+        def flush_and_drain():
+            for user in users:
+                user.flush()
+            for _, theirs in pairs[1:]:
+                theirs.recv(1 << 20)
+
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        broadcast()
+        queued = tracemalloc.get_traced_memory()[0] - baseline
+        tracemalloc.stop()
+        flush_and_drain()
+
+        started = time.process_time()
+        broadcast()
+        flush_and_drain()
+        cpu = (time.process_time() - started) / messages
+        for ours, theirs in pairs:
+            ours.close()
+            theirs.close()
+        print(f"{label:>20}: {queued / messages / 1024:8.1f} KB allocated, {cpu * 1e6:8.1f} us CPU per broadcast")
+
+
+_HISTORY_RECORD = struct.Struct("<IQd")  # payload length, sequence number, timestamp
+_HISTORY_INDEX = struct.Struct("<QdQ")  # sequence number, timestamp, offset in the segment
+
+
+class _Segment:
+    """One log file of a room, with its sparse index"""
+
+    def __init__(self, directory, base_seq):
+        self.base_seq = base_seq
+        self.path = os.path.join(directory, f"{base_seq:020d}.log")
+        self.index_path = os.path.join(directory, f"{base_seq:020d}.index")
+        self.size = 0
+        self.index_seq = array("Q")
+        self.index_time = array("d")
+        self.index_offset = array("Q")
+        self._map = None
+
+    def view(self):
+        """mmap of the segment, remapped when it has grown since the last read"""
+        if self._map is None or len(self._map) < self.size:
+            if self._map is not None:
+                self._map.close()
+            with open(self.path, "rb") as log:
+                self._map = mmap.mmap(log.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def records(self, offset):
+        """Yields (seq, timestamp, sender, message) from offset to the end of the segment"""
+        if offset >= self.size:
+            return
+        view = self.view()
+        while offset < self.size:
+            length, seq, timestamp = _HISTORY_RECORD.unpack_from(view, offset)
+            start = offset + _HISTORY_RECORD.size
+            sender, _, message = view[start:start + length].decode().partition("\0")
+            yield seq, timestamp, sender, message
+            offset = start + length
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def delete(self):
+        self.close()
+        os.remove(self.path)
+        os.remove(self.index_path)
+
+
+class _RoomLog:
+    """Segments of one room, the newest one open for appending"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.segments = []
+        self.next_seq = 0
+        self.last_time = float("-inf")
+        self.writer = None
+        self.index_writer = None
+        self.dirty = False
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(".log"):
+                self.segments.append(self._load(int(name[:-4])))
+        if self.segments:
+            self._open_writers(self.segments[-1])
+
+    def _load(self, base_seq):
+        """Reopens a segment: reads its index, then scans the tail and cuts off a torn record"""
+        segment = _Segment(self.directory, base_seq)
+        size = os.path.getsize(segment.path)
+        with open(segment.index_path, "rb") as index:
+            for seq, timestamp, offset in _HISTORY_INDEX.iter_unpack(index.read()):
+                if offset < size:
+                    segment.index_seq.append(seq)
+                    segment.index_time.append(timestamp)
+                    segment.index_offset.append(offset)
+        offset = segment.index_offset[-1] if segment.index_offset else 0
+        seq, timestamp = base_seq, self.last_time
+        with open(segment.path, "r+b") as log:
+            log.seek(offset)
+            while True:
+                header = log.read(_HISTORY_RECORD.size)
+                if len(header) < _HISTORY_RECORD.size:
+                    break
+                length, record_seq, record_time = _HISTORY_RECORD.unpack(header)
+                if len(log.read(length)) < length:
+                    break
+                seq, timestamp, offset = record_seq + 1, record_time, offset + _HISTORY_RECORD.size + length
+            log.truncate(offset)
+        segment.size = offset
+        self.next_seq, self.last_time = max(self.next_seq, seq), max(self.last_time, timestamp)
+        return segment
+
+    def _open_writers(self, segment):
+        self.writer = open(segment.path, "ab")
+        self.index_writer = open(segment.index_path, "ab")
+
+    def roll(self):
+        if self.writer is not None:
+            self.flush()
+            self.writer.close()
+            self.index_writer.close()
+        segment = _Segment(self.directory, self.next_seq)
+        open(segment.path, "wb").close()
+        open(segment.index_path, "wb").close()
+        self.segments.append(segment)
+        self._open_writers(segment)
+
+    def flush(self):
+        if self.dirty:
+            self.writer.flush()
+            self.index_writer.flush()
+            self.dirty = False
+
+    def close(self):
+        if self.writer is not None:
+            self.flush()
+            self.writer.close()
+            self.index_writer.close()
+        for segment in self.segments:
+            segment.close()
+
+
+class ChatHistoryStore:
+    """Segmented append-only message log per room with a sparse offset index"""
+
+    def __init__(self, directory, segment_bytes=64 << 20, index_interval=64, max_segments=None, max_age=None,
+                 clock=time.time):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.index_interval = index_interval
+        self.max_segments = max_segments  # Retention by segment count per room
+        self.max_age = max_age  # Retention by age in seconds
+        self.clock = clock
+        self._rooms = {}
+
+    def _room(self, room):
+        log = self._rooms.get(room)
+        if log is None:
+            name = hashlib.blake2b(room.encode(), digest_size=8).hexdigest()  # Safe as a directory name
+            log = self._rooms[room] = _RoomLog(os.path.join(self.directory, name))
+        return log
+
+    def append(self, room, sender, message, timestamp=None):
+        """Appends a message, returns its sequence number in the room"""
+        log = self._room(room)
+        if not log.segments or log.segments[-1].size >= self.segment_bytes:
+            log.roll()
+            self._enforce_retention(log)
+        segment = log.segments[-1]
+        seq = log.next_seq
+        timestamp = max(self.clock() if timestamp is None else timestamp, log.last_time)  # Keep time monotonic
+        payload = f"{sender}\0{message}".encode()
+        if (seq - segment.base_seq) % self.index_interval == 0:
+            log.index_writer.write(_HISTORY_INDEX.pack(seq, timestamp, segment.size))
+            segment.index_seq.append(seq)
+            segment.index_time.append(timestamp)
+            segment.index_offset.append(segment.size)
+        log.writer.write(_HISTORY_RECORD.pack(len(payload), seq, timestamp) + payload)
+        segment.size += _HISTORY_RECORD.size + len(payload)
+        log.next_seq, log.last_time, log.dirty = seq + 1, timestamp, True
+        return seq
+
+    def last(self, room, count):
+        """The last count messages of a room, oldest first, as (seq, timestamp, sender, message)"""
+        log = self._room(room)
+        if not log.segments or count <= 0:
+            return []
+        first = max(log.next_seq - count, log.segments[0].base_seq)
+        position = max(0, bisect_right([segment.base_seq for segment in log.segments], first) - 1)
+        segment = log.segments[position]
+        entry = max(0, bisect_right(segment.index_seq, first) - 1)
+        return self._scan(log, position, segment.index_offset[entry] if segment.index_offset else 0,
+                          lambda seq, timestamp: seq >= first)
+
+    def since(self, room, timestamp, limit=None):
+        """Messages of a room sent at or after timestamp, oldest first"""
+        log = self._room(room)
+        if not log.segments:
+            return []
+        first_times = [segment.index_time[0] if segment.index_time else float("inf") for segment in log.segments]
+        # Timestamps only never decrease, so records at exactly timestamp may start in an earlier segment
+        position = max(0, bisect_left(first_times, timestamp) - 1)
+        segment = log.segments[position]
+        entry = max(0, bisect_left(segment.index_time, timestamp) - 1)
+        return self._scan(log, position, segment.index_offset[entry] if segment.index_offset else 0,
+                          lambda seq, record_time: record_time >= timestamp, limit)
+
+    def _scan(self, log, position, offset, wanted, limit=None):
+        """Reads forward from offset in segment position, up to limit wanted records"""
+        log.flush()
+        messages = []
+        for segment in log.segments[position:]:
+            for record in segment.records(offset):
+                if messages or wanted(record[0], record[1]):
+                    messages.append(record)
+                    if limit is not None and len(messages) >= limit:
+                        return messages
+            offset = 0
+        return messages
+
+    def _enforce_retention(self, log):
+        """Deletes whole segments past max_segments or older than max_age, never the active one"""
+        while self.max_segments is not None and len(log.segments) > self.max_segments:
+            log.segments.pop(0).delete()
+        if self.max_age is not None:
+            cutoff = self.clock() - self.max_age
+            # A segment is expired once the next one starts before the cutoff
+            while len(log.segments) > 1 and log.segments[1].index_time and log.segments[1].index_time[0] < cutoff:
+                log.segments.pop(0).delete()
+
+    def close(self):
+        for log in self._rooms.values():
+            log.close()
+        self._rooms.clear()
+
+
+# Concrete Mediator that keeps a history
+class HistoryChatRoom(ChatRoom):
+    """ChatRoom that records every message, so late joiners can scroll back"""
+
+    def __init__(self, name, history):
+        super().__init__()
+        self.name = name
+        self.history = history
+
+    def send_message(self, message, sender):
+        self.history.append(self.name, sender.name, message)
+        super().send_message(message, sender)
+
+    def scrollback(self, count):
+        return [(sender, message) for _, _, sender, message in self.history.last(self.name, count)]
+
+
+def benchmark_history(messages=1_000_000, rooms=4, scrollbacks=1_000):
+    """Append throughput, then "last N" and "since T" scrollback latency"""
+    import random
+
+    directory = tempfile.mkdtemp(prefix="chat-history-")
+    try:
+        store = ChatHistoryStore(directory, segment_bytes=8 << 20)
+        names = [f"room{r}" for r in range(rooms)]
+        started = time.perf_counter()
+        for i in range(messages):
+            store.append(names[i % rooms], f"user{i % 97}", f"message number {i}", timestamp=float(i))
+        for name in names:
+            store._room(name).flush()
+        elapsed = time.perf_counter() - started
+        segments = sum(len(store._room(name).segments) for name in names)
+        print(f"append: {messages / elapsed:,.0f} messages/sec ({segments} segments)")
+
+        rng = random.Random(3)
+        for label, query in (("last 50", lambda room: store.last(room, 50)),
+                             ("since T", lambda room: store.since(room, rng.randrange(messages), limit=50))):
+            latencies = []
+            for _ in range(scrollbacks):
+                room = rng.choice(names)
+                started = time.perf_counter()
+                query(room)
+                latencies.append(time.perf_counter() - started)
+            latencies.sort()
+            print(f"{label}: p50 {latencies[len(latencies) // 2] * 1e6:.0f}us, "
+                  f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1e6:.0f}us")
+        store.close()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+class LatencyHistogram:
+    """Log-bucketed latency counts: constant memory, percentiles accurate to about 9%"""
+
+    def __init__(self, buckets_per_doubling=8, floor=1e-6):
+        self._scale = buckets_per_doubling
+        self._floor = floor
+        self._counts = {}  # bucket -> samples; a few hundred buckets cover microseconds to hours
+        self.count = 0
+        self.max = 0.0
+
+    def record(self, seconds):
+        bucket = 0 if seconds <= self._floor else int(math.log2(seconds / self._floor) * self._scale) + 1
+        self._counts[bucket] = self._counts.get(bucket, 0) + 1
+        self.count += 1
+        self.max = max(self.max, seconds)
+
+    def percentile(self, pct):
+        """Upper bound of the bucket holding the pct-th percentile sample"""
+        rank = max(1, math.ceil(self.count * pct / 100))
+        seen = 0
+        for bucket in sorted(self._counts):
+            seen += self._counts[bucket]
+            if seen >= rank:
+                return min(self._floor * 2 ** (bucket / self._scale), self.max)
+        return None
+
+
+# Async Concrete Mediator
+class AsyncChatRoom(ChatMediator):
+    """Mediator that delivers through per-user bounded inboxes, concurrently"""
+
+    OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "block")
+
+    def __init__(self):
+        self.users = []
+        self._inboxes = {}  # user -> asyncio.Queue of (message, sender, sent_at)
+        self._deliveries = []  # One delivery task per user
+        self.latencies = LatencyHistogram()  # Seconds from send_message() to receive_message()
+        self.dropped = 0
+
+    def add_user(self, user):
+        """Register a new user, must be called inside the running event loop"""
+        if user.overflow not in self.OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy {user.overflow!r}, expected one of {self.OVERFLOW_POLICIES}")
+        self.users.append(user)
+        inbox = self._inboxes[user] = asyncio.Queue(user.inbox_size)
+        self._deliveries.append(asyncio.get_running_loop().create_task(self._deliver(user, inbox)))
+
+    async def send_message(self, message, sender):
+        """Enqueue a message for all users except the sender"""
+        sent_at = time.perf_counter()
+        blocked = []
+        for user in self.users:
+            if user is sender:
+                continue
+            inbox = self._inboxes[user]
+            if not inbox.full():
+                inbox.put_nowait((message, sender, sent_at))
+            elif user.overflow == "drop_oldest":
+                inbox.get_nowait()
+                inbox.task_done()
+                inbox.put_nowait((message, sender, sent_at))
+                self.dropped += 1
+            elif user.overflow == "drop_newest":
+                self.dropped += 1
+            else:
+                blocked.append(inbox.put((message, sender, sent_at)))
+        if blocked:
+            await asyncio.gather(*blocked)
+
+    async def _deliver(self, user, inbox):
+        while True:
+            message, sender, sent_at = await inbox.get()
+            try:
+                await user.receive_message(message, sender)
+                self.latencies.record(time.perf_counter() - sent_at)
+            except Exception as error:
+                print(f"⚠️ Delivery to {user.name} failed: {error}")
+            finally:
+                inbox.task_done()
+
+    async def close(self):
+        """Waits until every inbox is delivered, then stops the delivery tasks"""
+        for inbox in self._inboxes.values():
+            await inbox.join()
+        for delivery in self._deliveries:
+            delivery.cancel()
+        await asyncio.gather(*self._deliveries, return_exceptions=True)
+
+    def latency_percentiles(self):
+        if not self.latencies.count:
+            return {}
+        return {f"p{pct}": self.latencies.percentile(pct) for pct in (50, 90, 99)} | {"max": self.latencies.max}
+
+
+# Async Colleague
+class AsyncUser(User):
+    """User of an AsyncChatRoom, receiving through a bounded inbox"""
+
+    def __init__(self, name, chat_mediator, inbox_size=100, overflow="drop_oldest"):
+        self.inbox_size = inbox_size
+        self.overflow = overflow
+        super().__init__(name, chat_mediator)
+
+    async def send_message(self, message):
+        """User sends a message"""
+        print(f"📤 {self.name} sends: {message}")
+        await self.chat_mediator.send_message(message, self)
+
+    async def receive_message(self, message, sender):
+        """User receives a message"""
+        print(f"📩 {self.name} received from {sender.name}: {message}")
+
+
+def benchmark_async_room(users=100_000, messages=5, slow_every=1_000, slow_delay=0.05):
+    """Delivery-latency percentiles in one room with many users, some of them slow"""
+
+    class QuietUser(AsyncUser):
+        async def send_message(self, message):
+            await self.chat_mediator.send_message(message, self)
+
+        async def receive_message(self, message, sender):
+            pass
+
+    class SlowUser(QuietUser):
+        async def receive_message(self, message, sender):
+            await asyncio.sleep(slow_delay)
+
+    async def run():
+        room = AsyncChatRoom()
+        members = [(SlowUser if i % slow_every == 0 else QuietUser)(f"user{i}", room, inbox_size=16)
+                   for i in range(users)]
+        started = time.perf_counter()
+        for i in range(messages):
+            await members[1].send_message(f"message {i}")
+        send_cost = (time.perf_counter() - started) / messages
+        await room.close()
+        elapsed = time.perf_counter() - started
+        stats = room.latency_percentiles()
+        print(f"{users:,} users, {messages} broadcasts: {room.latencies.count / elapsed:,.0f} deliveries/sec, "
+              f"sender {send_cost * 1000:.1f}ms per broadcast")
+        print("delivery latency " + ", ".join(f"{name}={value * 1000:.1f}ms" for name, value in stats.items()))
+
+    asyncio.run(run())
+
+
+class ConsistentHashRing:
+    """Maps keys to nodes; adding a node only moves the keys that now hash to it"""
+
+    def __init__(self, nodes=(), vnodes=64):
+        self.vnodes = vnodes
+        self._points = []  # Sorted hashes of the virtual nodes
+        self._owners = []  # Node of each point
+        for node in nodes:
+            self.add(node)
+
+    @staticmethod
+    def _hash(key):
+        return int.from_bytes(hashlib.blake2b(str(key).encode(), digest_size=8).digest(), "big")
+
+    def add(self, node):
+        for replica in range(self.vnodes):
+            point = self._hash(f"{node}#{replica}")
+            index = bisect(self._points, point)
+            self._points.insert(index, point)
+            self._owners.insert(index, node)
+
+    def node_for(self, key):
+        index = bisect(self._points, self._hash(key)) % len(self._points)
+        return self._owners[index]
+
+    @property
+    def nodes(self):
+        return sorted(set(self._owners))
+
+
+def _read_into(connection, inbox):
+    """Moves everything arriving on a connection into the shard's inbox"""
+    try:
+        while True:
+            inbox.put(connection.recv())
+    except (EOFError, OSError):
+        pass
+
+
+def _accept_peers(listener, inbox):
+    while True:
+        try:
+            connection = listener.accept()
+        except OSError:
+            return
+        threading.Thread(target=_read_into, args=(connection, inbox), daemon=True).start()
+
+
+def _shard_main(shard, control, addresses, vnodes, mailbox_size):
+    """Worker process owning the rooms and mailboxes the ring assigns to this shard"""
+    ring = ConsistentHashRing(addresses, vnodes)
+    rooms = {}  # room -> set of users
+    mailboxes = {}  # user -> deque of (sender, message) not collected yet, newest mailbox_size kept
+    peers = {}  # shard -> Connection used to send to it
+    sent = 0
+    delivered = 0  # Messages this shard put into mailboxes
+    inbox = queue.Queue()  # Reader threads never block, so two shards sending to each other can't deadlock
+    listener = Listener(addresses[shard], "AF_UNIX")
+    threading.Thread(target=_accept_peers, args=(listener, inbox), daemon=True).start()
+    threading.Thread(target=_read_into, args=(control, inbox), daemon=True).start()
+
+    def send_to(owner, command):
+        if owner not in peers:
+            peers[owner] = Client(addresses[owner], "AF_UNIX")
+        peers[owner].send(command)
+
+    def mailbox(user):
+        box = mailboxes.get(user)
+        if box is None:
+            box = mailboxes[user] = deque(maxlen=mailbox_size)
+        return box
+
+    def deliver(items):
+        nonlocal delivered
+        remote = {}
+        for sender, message, users in items:
+            local = []
+            for user in users:
+                owner = ring.node_for(user)
+                if owner == shard:
+                    local.append(user)
+                else:
+                    remote.setdefault(owner, []).append(user)
+            for user in local:
+                mailbox(user).append((sender, message))
+            delivered += len(local)
+            for owner, users in remote.items():
+                send_to(owner, ("deliver", [(sender, message, users)]))
+            remote.clear()
+
+    control.send("ready")
+    while True:
+        command = inbox.get()
+        kind = command[0]
+        if kind == "join":
+            _, room, user = command
+            rooms.setdefault(room, set()).add(user)
+        elif kind == "send":
+            misrouted = {}
+            items = []
+            for room, sender, message in command[1]:
+                owner = ring.node_for(room)
+                if owner != shard:
+                    misrouted.setdefault(owner, []).append((room, sender, message))
+                    continue
+                items.append((sender, message, [user for user in rooms.get(room, ()) if user != sender]))
+                sent += 1
+            deliver(items)
+            for owner, batch in misrouted.items():
+                send_to(owner, ("send", batch))
+        elif kind == "deliver":
+            deliver(command[1])  # Forwards again if the mailbox moved in the meantime
+        elif kind == "rebalance":
+            addresses = command[1]
+            ring = ConsistentHashRing(addresses, vnodes)
+            moved_rooms = {room: users for room, users in rooms.items() if ring.node_for(room) != shard}
+            moved_mailboxes = {user: list(box) for user, box in mailboxes.items() if ring.node_for(user) != shard}
+            for room in moved_rooms:
+                del rooms[room]
+            for user in moved_mailboxes:
+                del mailboxes[user]
+            control.send((moved_rooms, moved_mailboxes))
+        elif kind == "adopt":
+            for room, users in command[1].items():
+                rooms.setdefault(room, set()).update(users)
+            for user, messages in command[2].items():
+                mailbox(user).extend(messages)
+            control.send("adopted")
+        elif kind == "fetch":
+            control.send(list(mailboxes.pop(command[1], ())))
+        elif kind == "stats":
+            control.send({"rooms": len(rooms), "mailboxes": len(mailboxes), "sent": sent,
+                          "delivered": delivered})
+        elif kind == "stop":
+            break
+    listener.close()
+    for peer in peers.values():
+        peer.close()
+
+
+class ShardedChatMediator(ChatMediator):
+    """Routes rooms and users to worker processes by consistent hashing"""
+
+    def __init__(self, workers=2, vnodes=64, batch_size=512, mailbox_size=100):
+        self.vnodes = vnodes
+        self.batch_size = batch_size
+        self.mailbox_size = mailbox_size
+        self._directory = tempfile.mkdtemp(prefix="chat-shards-")
+        self._addresses = {}  # shard -> unix socket path
+        self._controls = {}  # shard -> Pipe end
+        self._processes = {}
+        self._pending = {}  # shard -> buffered (room, sender, message)
+        self.ring = ConsistentHashRing((), vnodes)
+        for _ in range(workers):
+            self._start_worker()
+        self.ring = ConsistentHashRing(self._addresses, vnodes)
+
+    def _start_worker(self):
+        shard = len(self._addresses)
+        self._addresses[shard] = os.path.join(self._directory, f"shard-{shard}.sock")
+        parent_end, child_end = Pipe()
+        process = Process(target=_shard_main, args=(shard, child_end, dict(self._addresses), self.vnodes, self.mailbox_size),
+                          daemon=True)
+        process.start()
+        parent_end.recv()  # Listening
+        self._controls[shard] = parent_end
+        self._processes[shard] = process
+        return shard
+
+    def add_worker(self):
+        """Starts one more worker and moves to it the rooms and mailboxes the new ring assigns it"""
+        self.flush()
+        shard = self._start_worker()
+        self.ring = ConsistentHashRing(self._addresses, self.vnodes)
+        moved_rooms, moved_mailboxes = {}, {}
+        for other, control in self._controls.items():
+            control.send(("rebalance", dict(self._addresses)))
+        for other, control in self._controls.items():
+            rooms, mailboxes = control.recv()
+            moved_rooms.update(rooms)
+            moved_mailboxes.update(mailboxes)
+        by_owner = {}
+        for room, users in moved_rooms.items():
+            by_owner.setdefault(self.ring.node_for(room), ({}, {}))[0][room] = users
+        for user, messages in moved_mailboxes.items():
+            by_owner.setdefault(self.ring.node_for(user), ({}, {}))[1][user] = messages
+        for owner, (rooms, mailboxes) in by_owner.items():
+            self._controls[owner].send(("adopt", rooms, mailboxes))
+            self._controls[owner].recv()
+        return shard
+
+    def join(self, room, user):
+        self._controls[self.ring.node_for(room)].send(("join", room, user))
+
+    def add_user(self, user):
+        """Register a ShardedUser in its room"""
+        self.join(user.room, user.name)
+
+    def send_message(self, message, sender):
+        """Send a message to everyone in the sender's room"""
+        self.post(sender.room, sender.name, message)
+
+    def fetch(self, user):
+        """Takes the (sender, message) pairs waiting in a user's mailbox"""
+        self.flush()
+        control = self._controls[self.ring.node_for(user)]
+        control.send(("fetch", user))
+        return control.recv()
+
+    def post(self, room, sender, message):
+        """Queues a message for the room's shard, sent in batches of batch_size"""
+        shard = self.ring.node_for(room)
+        batch = self._pending.setdefault(shard, [])
+        batch.append((room, sender, message))
+        if len(batch) >= self.batch_size:
+            self._controls[shard].send(("send", batch))
+            self._pending[shard] = []
+
+    def flush(self):
+        for shard, batch in self._pending.items():
+            if batch:
+                self._controls[shard].send(("send", batch))
+        self._pending.clear()
+
+    def stats(self):
+        for control in self._controls.values():
+            control.send(("stats",))
+        return {shard: control.recv() for shard, control in self._controls.items()}
+
+    def wait_delivered(self, expected, timeout=60.0):
+        """Polls the shards until expected deliveries have landed in mailboxes"""
+        self.flush()
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if sum(stats["delivered"] for stats in self.stats().values()) >= expected:
+                return True
+            time.sleep(0.005)
+        return False
+
+    def close(self):
+        for control in self._controls.values():
+            control.send(("stop",))
+        for process in self._processes.values():
+            process.join()
+        shutil.rmtree(self._directory, ignore_errors=True)
+
+
+# Sharded Colleague
+class ShardedUser(User):
+    """User of a ShardedChatMediator; its mailbox lives on the shard that owns it"""
+
+    def __init__(self, name, room, chat_mediator):
+        self.room = room
+        super().__init__(name, chat_mediator)
+
+    def check_messages(self):
+        """Collects the mailbox and receives every message in it"""
+        for sender, message in self.chat_mediator.fetch(self.name):
+            self.receive_message(message, sender)
+
+    def receive_message(self, message, sender):
+        """User receives a message; sender is the sending user's name"""
+        print(f"📩 {self.name} received from {sender}: {message}")
+
+
+def benchmark_sharded_mediator(max_workers=None, rooms=512, users_per_room=20, messages=50_000):
+    """Aggregate messages/sec from 1 to N worker processes"""
+    import random
+
+    max_workers = max_workers or min(4, os.cpu_count() or 1)
+    rng = random.Random(9)
+    members = {f"room{r}": [f"user{r}-{u}" for u in range(users_per_room)] for r in range(rooms)}
+    workload = [(room, rng.choice(members[room])) for room in rng.choices(list(members), k=messages)]
+    expected = messages * (users_per_room - 1)
+
+    for workers in range(1, max_workers + 1):
+        mediator = ShardedChatMediator(workers)
+        for room, users in members.items():
+            for user in users:
+                mediator.join(room, user)
+        mediator.stats()  # Every join has been applied
+        started = time.perf_counter()
+        for room, sender in workload:
+            mediator.post(room, sender, "hello")
+        delivered = mediator.wait_delivered(expected)
+        elapsed = time.perf_counter() - started
+        mediator.close()
+        print(f"{workers} worker(s): {messages / elapsed:>9,.0f} messages/sec, "
+              f"{expected / elapsed:>11,.0f} deliveries/sec{'' if delivered else ' (timed out)'}")
+
+
 # Client Code
 if __name__ == "__main__":
     chat_room = ChatRoom()  # Create Mediator
@@ -70,3 +971,68 @@ if __name__ == "__main__":
     user1.send_message("Hello, everyone! 👋")
     user2.send_message("Hey Alice! How are you? 😊")
     user3.send_message("Good morning all! ☀️")
+
+    # Async chat room: sending only enqueues, every user receives concurrently
+    async def async_chat():
+        room = AsyncChatRoom()
+        alice = AsyncUser("Alice", room)
+        AsyncUser("Bob", room)
+        AsyncUser("Charlie", room, inbox_size=1, overflow="drop_newest")
+        await alice.send_message("Hi from the async room! 🚀")
+        await alice.send_message("Charlie's inbox is full, so this one is dropped for Charlie")
+        await room.close()
+        print(f"Dropped deliveries: {room.dropped}")
+
+    print()
+    asyncio.run(async_chat())
+
+    # Encode-once broadcast: one payload shared by every socket, one vectored send each
+    room = BroadcastChatRoom(flush_every=2)
+    ours, theirs = socket.socketpair()
+    sender = User("Alice", room)
+    SocketUser("Bob", room, ours)
+    sender.send_message("First message")
+    sender.send_message("Second message, flushed together with the first")
+    print(f"📨 Bob's socket got: {theirs.recv(1024)!r}")
+    ours.close()
+    theirs.close()
+
+    print("\nBroadcast benchmark:")
+    benchmark_broadcast()
+
+    # Chat history: a late joiner scrolls back through what was said before
+    directory = tempfile.mkdtemp(prefix="chat-history-")
+    history = ChatHistoryStore(directory)
+    room = HistoryChatRoom("general", history)
+    alice = User("Alice", room)
+    alice.send_message("Is anyone here?")
+    alice.send_message("I'll leave a note then 📝")
+    late_joiner = User("Dave", room)
+    print(f"Dave scrolls back: {room.scrollback(10)}")
+    history.close()
+    shutil.rmtree(directory)
+
+    print("\nChat history benchmark:")
+    benchmark_history()
+
+    print("\nAsync chat room benchmark:")
+    benchmark_async_room()
+
+    # Sharded mediator: rooms and users spread over worker processes
+    print()
+    mediator = ShardedChatMediator(workers=2)
+    members = {(room, name): ShardedUser(f"{name}@{room}", room, mediator)
+               for room in ("general", "random", "python") for name in ("Alice", "Bob", "Charlie")}
+    members["general", "Alice"].send_message("Hello, shards! 👋")
+    mediator.wait_delivered(2)
+    mediator.add_worker()  # Rebalances part of the rooms and mailboxes onto the new worker
+    members["python", "Bob"].send_message("Still delivered after rebalancing")
+    mediator.wait_delivered(4)
+    for member in members.values():
+        member.check_messages()
+    for shard, stats in mediator.stats().items():
+        print(f"Shard {shard}: {stats}")
+    mediator.close()
+
+    print("\nSharded mediator benchmark:")
+    benchmark_sharded_mediator()
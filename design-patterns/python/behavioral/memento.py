@@ -10,6 +10,41 @@
 # Undo/Redo in applications (Text Editors, Photoshop, IDEs)
 # State Management in Games (Saving and loading checkpoints)
 
+# 📌 Delta Mementos
+# Frequent snapshots of a large document are mostly identical full copies. With
+# keyframe_every set, TextEditor.save() returns a DeltaTextMemento that only stores what changed
+# since the previous snapshot (common prefix and suffix lengths plus the new middle). Every
+# keyframe_every-th snapshot is a full copy, so restoring any snapshot replays at most
+# keyframe_every - 1 deltas.
+
+# 📌 Memory-Budgeted History
+# BudgetedHistory keeps the newest hot_snapshots mementos as live objects, compresses older ones
+# with zlib or lzma, and once resident bytes exceed memory_budget appends the oldest compressed
+# snapshots to a spill file that is read back through mmap. The budget wins over hot_snapshots:
+# if the live snapshots alone do not fit, they are compressed and spilled as well. Undo always
+# pops the newest snapshot, so the spill file behaves like a stack and is truncated as it is consumed.
+
+# 📌 Generic Snapshots
+# Snapshot captures any originator's attributes with pickle protocol 5. Read-only out-of-band
+# buffers are kept by reference instead of being copied into the pickle stream, and CowBuffer is
+# a chunked bytearray that exports its chunks that way: after a snapshot both sides share the
+# chunks, and whichever side writes to a chunk first copies just that chunk. Restore hands the
+# same buffers back to pickle, so neither capture nor restore copies the large data. Writable
+# exports (NumPy arrays, for instance) are copied on capture and again on every restore, and plain
+# bytearray attributes are pickled in-band; keep large state in a CowBuffer to share it.
+
+import copy
+import lzma
+import mmap
+import pickle
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import zlib
+from collections import deque
+
 
 # Memento Class
 class TextMemento:
@@ -20,11 +55,69 @@ class TextMemento:
     def get_saved_text(self):
         return self._text
 
+    def memory_size(self):
+        return sys.getsizeof(self._text)
+
+
+def _common_prefix_length(a, b):
+    """Length of the common prefix, found by bisecting on slice comparisons"""
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[low:middle] == b[low:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+# Delta Memento Class
+class DeltaTextMemento(TextMemento):
+    """Stores a keyframe, or the difference from the previous memento"""
+
+    def __init__(self, text, previous=None, keyframe_every=16):
+        if previous is None or previous._depth + 1 >= keyframe_every:
+            super().__init__(text)  # Keyframe: a full copy
+            self._base = None
+            self._depth = 0
+            return
+        base_text = previous.get_saved_text()
+        prefix = _common_prefix_length(base_text, text)
+        suffix = _common_prefix_length(base_text[prefix:][::-1], text[prefix:][::-1])
+        super().__init__(None)
+        self._base = previous
+        self._depth = previous._depth + 1
+        self._prefix = prefix
+        self._suffix = suffix
+        self._middle = text[prefix:len(text) - suffix]
+
+    def get_saved_text(self):
+        if self._base is None:
+            return self._text
+        chain = []
+        memento = self
+        while memento._base is not None:
+            chain.append(memento)
+            memento = memento._base
+        text = memento._text
+        for delta in reversed(chain):
+            text = text[:delta._prefix] + delta._middle + text[len(text) - delta._suffix:]
+        return text
+
+    def memory_size(self):
+        return sys.getsizeof(self._text if self._base is None else self._middle)
+
+    def __reduce__(self):
+        # Serialized snapshots are flattened to full copies, so they do not drag their chain along
+        return TextMemento, (self.get_saved_text(),)
+
 # Originator Class
 class TextEditor:
     """Text Editor that can create and restore snapshots"""
-    def __init__(self):
+    def __init__(self, keyframe_every=None):
         self._text = ""
+        self._keyframe_every = keyframe_every  # None saves full copies
+        self._last_memento = None
 
     def type(self, new_text):
         """Appends new text"""
@@ -32,11 +125,16 @@ class TextEditor:
 
     def save(self):
         """Saves the current state"""
-        return TextMemento(self._text)
+        if self._keyframe_every is None:
+            return TextMemento(self._text)
+        self._last_memento = DeltaTextMemento(self._text, self._last_memento, self._keyframe_every)
+        return self._last_memento
 
     def restore(self, memento):
         """Restores a saved state"""
         self._text = memento.get_saved_text()
+        if isinstance(memento, DeltaTextMemento):
+            self._last_memento = memento  # The next delta is taken against the restored text
 
     def show_text(self):
         """Displays the current text"""
@@ -58,6 +156,347 @@ class History:
             return self._history.pop()
         return None
 
+
+_CODECS = {
+    "zlib": (lambda data: zlib.compress(data, 6), zlib.decompress),
+    "lzma": (lambda data: lzma.compress(data, preset=1), lzma.decompress),
+}
+
+
+# Budgeted Caretaker Class
+class BudgetedHistory(History):
+    """Undo history that compresses and then spills older mementos to stay within a memory budget"""
+
+    def __init__(self, memory_budget=64 * 1024 * 1024, hot_snapshots=8, compression="zlib",
+                 spill_path=None):
+        self._compress, self._decompress = _CODECS[compression]
+        self._memory_budget = memory_budget
+        self._hot_snapshots = hot_snapshots
+        self._hot = deque()         # (memento, size), newest on the right
+        self._compressed = deque()  # compressed bytes, newest on the right
+        self._spilled = []          # (offset, length) in the spill file, newest last
+        self._hot_bytes = 0
+        self._compressed_bytes = 0
+        self._spill_end = 0
+        self._spill_file = open(spill_path, "w+b") if spill_path else tempfile.TemporaryFile()
+        self._map = None
+        self._latency = {"hot": [0, 0.0], "compressed": [0, 0.0], "spilled": [0, 0.0]}  # [undos, seconds]
+
+    def save_state(self, memento):
+        """Stores a memento, demoting older ones to keep within budget"""
+        size = memento.memory_size() if hasattr(memento, "memory_size") else len(pickle.dumps(memento, 5))
+        self._hot.append((memento, size))
+        self._hot_bytes += size
+        while len(self._hot) > self._hot_snapshots:
+            self._demote_hot()
+        while self._hot_bytes + self._compressed_bytes > self._memory_budget:
+            if self._compressed:
+                self._spill(self._compressed.popleft())
+            elif self._hot:
+                self._demote_hot()  # The live snapshots alone are over budget
+            else:
+                break
+
+    def _demote_hot(self):
+        oldest, oldest_size = self._hot.popleft()
+        self._hot_bytes -= oldest_size
+        data = self._compress(pickle.dumps(oldest, 5))
+        self._compressed.append(data)
+        self._compressed_bytes += len(data)
+
+    def _spill(self, data):
+        self._compressed_bytes -= len(data)
+        self._spill_file.seek(self._spill_end)
+        self._spill_file.write(data)
+        self._spilled.append((self._spill_end, len(data)))
+        self._spill_end += len(data)
+
+    def _read_spilled(self):
+        offset, length = self._spilled.pop()
+        if self._map is None or len(self._map) < offset + length:
+            if self._map is not None:
+                self._map.close()
+            self._spill_file.flush()
+            self._map = mmap.mmap(self._spill_file.fileno(), self._spill_end, access=mmap.ACCESS_READ)
+        data = self._map[offset:offset + length]
+        self._map.close()  # The tail is about to be truncated away
+        self._map = None
+        self._spill_end = offset
+        self._spill_file.truncate(offset)
+        return data
+
+    def undo(self):
+        """Restores the last saved state, wherever it currently lives"""
+        started = time.perf_counter()
+        if self._hot:
+            tier = "hot"
+            memento, size = self._hot.pop()
+            self._hot_bytes -= size
+        elif self._compressed:
+            tier = "compressed"
+            data = self._compressed.pop()
+            self._compressed_bytes -= len(data)
+            memento = pickle.loads(self._decompress(data))
+        elif self._spilled:
+            tier = "spilled"
+            memento = pickle.loads(self._decompress(self._read_spilled()))
+        else:
+            return None
+        totals = self._latency[tier]
+        totals[0] += 1
+        totals[1] += time.perf_counter() - started
+        return memento
+
+    def __len__(self):
+        return len(self._hot) + len(self._compressed) + len(self._spilled)
+
+    def stats(self):
+        """Tier sizes and mean undo latency per tier (hot = newest, spilled = oldest)"""
+        return {
+            "hot_snapshots": len(self._hot),
+            "compressed_snapshots": len(self._compressed),
+            "spilled_snapshots": len(self._spilled),
+            "resident_bytes": self._hot_bytes + self._compressed_bytes,
+            "spilled_bytes": self._spill_end,
+            "undo_latency_ms": {tier: seconds / undos * 1000 if undos else None
+                                for tier, (undos, seconds) in self._latency.items()},
+        }
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+        self._spill_file.close()
+
+
+# Copy-on-Write Buffer
+class CowBuffer:
+    """A chunked bytearray whose chunks are shared with snapshots until written"""
+
+    def __init__(self, data=b"", chunk_size=1024 * 1024):
+        if isinstance(data, int):
+            data = bytes(data)
+        view = memoryview(data)
+        self._chunk_size = chunk_size
+        self._length = len(view)
+        self._chunks = [bytearray(view[i:i + chunk_size]) for i in range(0, len(view), chunk_size)]
+        self._owned = set(range(len(self._chunks)))  # Chunks nobody else can see
+        self.copied_bytes = 0
+
+    @classmethod
+    def _from_chunks(cls, chunk_size, length, chunks):
+        buffer = cls.__new__(cls)
+        buffer._chunk_size = chunk_size
+        buffer._length = length
+        buffer._chunks = [memoryview(chunk) for chunk in chunks]  # Shared, read-only
+        buffer._owned = set()
+        buffer.copied_bytes = 0
+        return buffer
+
+    def __reduce_ex__(self, protocol):
+        if protocol < 5:
+            return CowBuffer, (self.tobytes(), self._chunk_size)
+        self._owned.clear()  # From now on the snapshot sees these chunks too
+        chunks = [pickle.PickleBuffer(memoryview(chunk).toreadonly()) for chunk in self._chunks]
+        return CowBuffer._from_chunks, (self._chunk_size, self._length, chunks)
+
+    def __len__(self):
+        return self._length
+
+    def _writable(self, index):
+        if index not in self._owned:
+            self._chunks[index] = bytearray(self._chunks[index])
+            self._owned.add(index)
+            self.copied_bytes += len(self._chunks[index])
+        return self._chunks[index]
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self._length)
+            if step != 1:
+                raise ValueError("CowBuffer slices must be contiguous")
+            parts = []
+            while start < stop:
+                index, offset = divmod(start, self._chunk_size)
+                take = min(stop - start, self._chunk_size - offset)
+                parts.append(self._chunks[index][offset:offset + take])
+                start += take
+            return b"".join(parts)
+        if key < 0:
+            key += self._length
+        if not 0 <= key < self._length:
+            raise IndexError("CowBuffer index out of range")
+        index, offset = divmod(key, self._chunk_size)
+        return self._chunks[index][offset]
+
+    def __setitem__(self, key, value):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self._length)
+            value = memoryview(value).cast("B")
+            if step != 1 or stop - start != len(value):
+                raise ValueError("CowBuffer slice assignment must keep the length")
+            done = 0
+            while start < stop:
+                index, offset = divmod(start, self._chunk_size)
+                take = min(stop - start, self._chunk_size - offset)
+                self._writable(index)[offset:offset + take] = value[done:done + take]
+                start += take
+                done += take
+            return
+        if key < 0:
+            key += self._length
+        if not 0 <= key < self._length:
+            raise IndexError("CowBuffer index out of range")
+        index, offset = divmod(key, self._chunk_size)
+        self._writable(index)[offset] = value
+
+    def tobytes(self):
+        return b"".join(self._chunks)
+
+
+# Generic Memento Class
+class Snapshot:
+    """Captures any originator's attributes; read-only buffers are shared, writable ones copied
+
+    Only CowBuffer chunks and other read-only PickleBuffer exports are shared. A plain bytearray
+    attribute is pickled in-band, so it is copied into the payload and not counted in copied_bytes.
+    """
+
+    def __init__(self, originator):
+        self.shared_bytes = 0
+        self.copied_bytes = 0
+        self._buffers = []
+        self._private = set()  # Indexes of buffers the originator must get its own copy of
+        self._payload = pickle.dumps(vars(originator), protocol=5, buffer_callback=self._keep)
+
+    def _keep(self, buffer):
+        view = buffer.raw()
+        if view.readonly:
+            self._buffers.append(buffer)  # Immutable, so a reference is as good as a copy
+            self.shared_bytes += view.nbytes
+        else:
+            # Writable exports (NumPy arrays, for instance) could change under us: keep an immutable copy
+            self._private.add(len(self._buffers))
+            self._buffers.append(view.tobytes())
+            self.copied_bytes += view.nbytes
+
+    @property
+    def nbytes(self):
+        return len(self._payload) + self.shared_bytes + self.copied_bytes
+
+    def memory_size(self):
+        # Shared chunks are also referenced by the live originator and neighbouring snapshots, so
+        # they are not charged to the history budget; only what this snapshot owns alone counts
+        return len(self._payload) + self.copied_bytes
+
+    def restore_into(self, originator):
+        """Replaces the originator's attributes with the captured ones"""
+        buffers = [bytearray(buffer) if index in self._private else buffer
+                   for index, buffer in enumerate(self._buffers)]
+        state = pickle.loads(self._payload, buffers=buffers)
+        originator.__dict__.clear()
+        originator.__dict__.update(state)
+
+
+# Originator Class with large binary state
+class ImageCanvas:
+    """A canvas whose pixels live in a CowBuffer, so snapshots are cheap"""
+    def __init__(self, size, chunk_size=1024 * 1024):
+        self.pixels = CowBuffer(size, chunk_size)
+        self.layers = ["background"]
+
+    def paint(self, offset, data):
+        self.pixels[offset:offset + len(data)] = data
+
+    def save(self):
+        return Snapshot(self)
+
+    def restore(self, snapshot):
+        snapshot.restore_into(self)
+
+
+def benchmark_mementos(document_chars=1_000_000, snapshots=200, keyframe_every=16, restores=50):
+    """History memory and restore time: full-copy mementos vs delta mementos"""
+    rng = random.Random(1)
+    document = "".join(rng.choice("abcdefghij \n") for _ in range(document_chars))
+    edits = [(rng.randrange(document_chars), "edit" * 5) for _ in range(snapshots)]
+
+    for label, editor in (("full copies", TextEditor()), (f"deltas, keyframe every {keyframe_every}",
+                                                         TextEditor(keyframe_every))):
+        history = History()
+        editor.type(document)
+        tracemalloc.start()
+        for position, inserted in edits:
+            editor._text = editor._text[:position] + inserted + editor._text[position:]
+            history.save_state(editor.save())
+        history_bytes = tracemalloc.get_traced_memory()[0] - sys.getsizeof(editor._text)
+        tracemalloc.stop()
+
+        mementos = history._history
+        started = time.perf_counter()
+        for _ in range(restores):
+            editor.restore(rng.choice(mementos))
+        restore_time = (time.perf_counter() - started) / restores
+        print(f"{label:>26}: history {history_bytes / 1e6:7.1f} MB, restore {restore_time * 1000:6.2f}ms")
+
+
+def benchmark_budgeted_history(document_chars=200_000, snapshots=200, memory_budget=8 * 1024 * 1024,
+                               compression="zlib"):
+    """Resident vs spilled bytes and undo latency by age for a memory-budgeted history"""
+    rng = random.Random(2)
+    editor = TextEditor()
+    editor.type("".join(rng.choice("the quick brown fox jumps over a lazy dog\n") for _ in range(document_chars)))
+    history = BudgetedHistory(memory_budget, compression=compression)
+    unbounded = 0
+    for _ in range(snapshots):
+        position = rng.randrange(len(editor._text))
+        editor._text = editor._text[:position] + "edit" + editor._text[position:]
+        memento = editor.save()
+        unbounded += memento.memory_size()
+        history.save_state(memento)
+    stats = history.stats()
+    print(f"  {compression}: {snapshots} snapshots, {unbounded / 2 ** 20:.1f} MiB as a plain list -> "
+          f"{stats['resident_bytes'] / 2 ** 20:.2f} MiB resident (budget {memory_budget / 2 ** 20:.0f} MiB), "
+          f"{stats['spilled_bytes'] / 2 ** 20:.1f} MiB spilled "
+          f"({stats['hot_snapshots']} hot / {stats['compressed_snapshots']} compressed / "
+          f"{stats['spilled_snapshots']} spilled)")
+    while history.undo() is not None:
+        pass
+    latency = history.stats()["undo_latency_ms"]
+    print("  undo latency: " + ", ".join(f"{tier} {ms:.3f}ms" for tier, ms in latency.items()))
+    history.close()
+
+
+def benchmark_snapshots(state_bytes=256 * 1024 * 1024):
+    """Snapshot and restore of a large binary state: deepcopy vs in-band pickle vs Snapshot"""
+    print(f"  state: {state_bytes / 2 ** 20:.0f} MiB")
+    plain = {"pixels": bytearray(state_bytes)}
+    started = time.perf_counter()
+    copied = copy.deepcopy(plain)
+    print(f"  {'deepcopy':>14}: snapshot {(time.perf_counter() - started) * 1000:8.1f}ms")
+    del copied
+    started = time.perf_counter()
+    payload = pickle.dumps(plain, protocol=5)
+    middle = time.perf_counter()
+    pickle.loads(payload)
+    print(f"  {'in-band pickle':>14}: snapshot {(middle - started) * 1000:8.1f}ms, "
+          f"restore {(time.perf_counter() - middle) * 1000:8.1f}ms")
+    del payload, plain
+
+    canvas = ImageCanvas(state_bytes)
+    started = time.perf_counter()
+    snapshot = canvas.save()
+    middle = time.perf_counter()
+    canvas.paint(0, b"\xff" * 64)  # The first write after a snapshot copies one chunk
+    written = time.perf_counter()
+    copied = canvas.pixels.copied_bytes
+    canvas.restore(snapshot)
+    restored = time.perf_counter()
+    print(f"  {'Snapshot':>14}: snapshot {(middle - started) * 1000:8.1f}ms, "
+          f"restore {(restored - written) * 1000:8.1f}ms, first write {(written - middle) * 1000:.1f}ms "
+          f"(copied {copied / 2 ** 20:.0f} MiB, "
+          f"shared {snapshot.shared_bytes / 2 ** 20:.0f} MiB)")
+
+
 # Client Code
 if __name__ == "__main__":
     editor = TextEditor()
@@ -93,3 +532,42 @@ if __name__ == "__main__":
         editor.restore(last_state)
     editor.show_text()  # 📄 Current Text: Hello,
 
+    # Delta mementos: only the changes are stored between keyframes
+    editor = TextEditor(keyframe_every=4)
+    history = History()
+    for word in ("Delta ", "mementos ", "store ", "only ", "changes"):
+        editor.type(word)
+        history.save_state(editor.save())
+    history.undo()
+    editor.restore(history.undo())
+    editor.show_text()  # 📄 Current Text: Delta mementos store only
+
+    print("\nMemento benchmark:")
+    benchmark_mementos()
+
+    # A budgeted history is a drop-in caretaker: undo() does not care where a snapshot lives
+    editor = TextEditor()
+    history = BudgetedHistory(memory_budget=200, hot_snapshots=1)
+    for word in ("Old ", "snapshots ", "spill ", "to ", "disk"):
+        editor.type(word)
+        history.save_state(editor.save())
+    print(history.stats())
+    while (last_state := history.undo()) is not None:
+        editor.restore(last_state)
+    editor.show_text()  # 📄 Current Text: Old
+
+    print("\nBudgeted history benchmark:")
+    benchmark_budgeted_history()
+    benchmark_budgeted_history(snapshots=100, compression="lzma")
+
+    # Generic snapshots: large buffers are shared with the memento until someone writes to them
+    canvas = ImageCanvas(8, chunk_size=4)
+    history = History()
+    history.save_state(canvas.save())
+    canvas.paint(0, b"ab")
+    canvas.layers.append("sketch")
+    canvas.restore(history.undo())
+    print(f"🖼️ Canvas: {canvas.pixels.tobytes()} {canvas.layers}")  # 🖼️ Canvas: b'\x00\x00...' ['background']
+
+    print("\nSnapshot benchmark:")
+    benchmark_snapshots()
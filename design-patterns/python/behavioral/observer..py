@@ -1,7 +1,19 @@
 # The Observer Design Pattern defines a one-to-many dependency between objects so that
 #  when one object (Subject) changes state, all its dependents (Observers) are notified automatically.
 
+# 📌 Asynchronous Notification
+# With a dispatcher, set_temperature() only hands the new value to an ObserverDispatcher and
+# returns; a fan-out thread queues each observer on a worker pool. Every observer has one slot
+# holding its latest undelivered value, so a slow observer never has more than one call queued
+# and simply skips to the newest temperature. Exceptions are caught and counted per observer.
+# A watchdog flags calls that run past the timeout and starts a replacement worker, so stuck
+# observers cannot starve the others of threads.
 
+import contextlib
+import io
+import queue
+import threading
+import time
 from abc import ABC, abstractmethod
 
 # Observer Interface
@@ -29,6 +41,189 @@ class LEDPanel(Observer):
     def update(self, temperature):
         print(f"💡 LED Panel: Updated Temperature -> {temperature}°C")
 
+_EMPTY = object()
+
+
+class _ObserverSlot:
+    """Delivery state and counters for one observer"""
+    __slots__ = ("observer", "pending", "busy", "started", "timed_out", "replaced", "delivered",
+                 "failures", "timeouts", "last_error")
+
+    def __init__(self, observer):
+        self.observer = observer
+        self.pending = _EMPTY
+        self.busy = False
+        self.started = None
+        self.timed_out = False
+        self.replaced = False  # A replacement worker was started while this call was stuck
+        self.delivered = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.last_error = None
+
+
+# Asynchronous Dispatcher
+class ObserverDispatcher:
+    """Delivers updates on worker threads with latest-value coalescing, timeouts and failure isolation"""
+
+    def __init__(self, workers=16, timeout=0.5, max_extra_workers=64):
+        self._timeout = timeout
+        self._max_extra_workers = max_extra_workers
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._handoff = threading.Condition()  # Separate, so publish() never waits on a fan-out
+        self._latest = None  # (observers, value) waiting for the fan-out thread
+        self._published = 0
+        self._fanned_out = 0
+        self._ready = queue.SimpleQueue()
+        self._slots = {}
+        self._forgotten = {}  # observer -> last publish whose fan-out may still list it
+        self._running = set()
+        self._busy = 0
+        self._workers = 0
+        self._extra_workers = 0  # Replacements for workers stuck past the timeout
+        self._coalesced = 0
+        self._superseded = 0  # Publishes replaced before fan-out; guarded by _handoff
+        self._closed = False
+        for _ in range(workers):
+            self._start_worker()
+        threading.Thread(target=self._fan_out, daemon=True).start()
+        threading.Thread(target=self._watchdog, daemon=True).start()
+
+    def _start_worker(self):
+        self._workers += 1
+        threading.Thread(target=self._work, daemon=True).start()
+
+    def publish(self, observers, value):
+        """Queues value for observers (a tuple) in constant time"""
+        with self._handoff:
+            if self._latest is not None:
+                self._superseded += 1  # The fan-out thread has not picked up the previous value yet
+            self._latest = (observers, value)
+            self._published += 1
+            self._handoff.notify()
+
+    def forget(self, observer):
+        """Drops an observer's slot; publishes made before this call will not recreate it"""
+        with self._handoff:
+            sequence = self._published
+        with self._lock:
+            self._slots.pop(observer, None)
+            if sequence > self._fanned_out:
+                self._forgotten[observer] = sequence
+
+    def _fan_out(self, batch=512):
+        while True:
+            with self._handoff:
+                while self._latest is None and not self._closed:
+                    self._handoff.wait()
+                if self._closed:
+                    return
+                (observers, value), sequence = self._latest, self._published
+                self._latest = None
+            for start in range(0, len(observers), batch):
+                with self._lock:
+                    self._enqueue(observers[start:start + batch], value, sequence)
+            with self._lock:
+                self._fanned_out = sequence
+                if self._forgotten:  # No fan-out at or before this publish is left to skip them
+                    self._forgotten = {observer: last for observer, last in self._forgotten.items()
+                                       if last > sequence}
+                if self._busy == 0:
+                    self._changed.notify_all()
+
+    def _enqueue(self, observers, value, sequence):
+        for observer in observers:
+            slot = self._slots.get(observer)
+            if slot is None:
+                if observer in self._forgotten:
+                    if sequence <= self._forgotten[observer]:
+                        continue  # Removed after this value was published
+                    del self._forgotten[observer]  # Added back since
+                slot = self._slots[observer] = _ObserverSlot(observer)
+            if slot.pending is not _EMPTY:
+                self._coalesced += 1
+            slot.pending = value
+            if not slot.busy:
+                slot.busy = True
+                self._busy += 1
+                self._ready.put(slot)
+
+    def _work(self):
+        while True:
+            slot = self._ready.get()
+            if slot is None:
+                return
+            with self._lock:
+                value, slot.pending = slot.pending, _EMPTY
+                slot.started = time.monotonic()
+                self._running.add(slot)
+            try:
+                slot.observer.update(value)
+                slot.delivered += 1
+            except Exception as error:  # One faulty observer must not affect the others
+                slot.failures += 1
+                slot.last_error = error
+            with self._lock:
+                self._running.discard(slot)
+                retire, slot.replaced = slot.replaced, False
+                slot.started = None
+                slot.timed_out = False
+                if slot.pending is not _EMPTY and not self._closed:
+                    self._ready.put(slot)  # A newer value arrived while this one was delivered
+                else:
+                    slot.busy = False
+                    self._busy -= 1
+                    if self._busy == 0 and self._fanned_out == self._published:
+                        self._changed.notify_all()
+                if retire:
+                    self._extra_workers -= 1  # Its replacement keeps running; this thread retires
+                    self._workers -= 1
+                    return
+
+    def _watchdog(self):
+        while not self._closed:
+            time.sleep(self._timeout / 4)
+            now = time.monotonic()
+            with self._lock:
+                for slot in self._running:
+                    if not slot.timed_out and now - slot.started > self._timeout:
+                        slot.timed_out = True
+                        slot.timeouts += 1
+                        if self._extra_workers < self._max_extra_workers:
+                            slot.replaced = True
+                            self._extra_workers += 1
+                            self._start_worker()
+
+    def wait_idle(self, timeout=None):
+        """Blocks until every published value has been delivered (or given up on)"""
+        with self._lock:
+            return self._changed.wait_for(lambda: self._busy == 0 and self._fanned_out == self._published,
+                                          timeout)
+
+    def stats(self):
+        with self._lock:
+            slots = list(self._slots.values())
+            return {
+                "observers": len(slots),
+                "delivered": sum(slot.delivered for slot in slots),
+                "failures": sum(slot.failures for slot in slots),
+                "timeouts": sum(slot.timeouts for slot in slots),
+                "coalesced": self._coalesced + self._superseded,
+                "in_flight": self._busy,
+                "workers": self._workers,
+            }
+
+    def close(self):
+        with self._handoff:
+            self._closed = True
+            self._handoff.notify()
+        with self._lock:
+            workers = self._workers
+        for _ in range(workers):
+            self._ready.put(None)
+
+
 # Subject Interface
 class Subject(ABC):
     """Abstract Subject that maintains a list of observers"""
@@ -49,17 +244,23 @@ class Subject(ABC):
 class WeatherStation(Subject):
     """Subject that stores temperature and notifies observers"""
 
-    def __init__(self):
+    def __init__(self, dispatcher=None):
         self._observers = []
         self._temperature = 0  # Initial temperature
+        self._dispatcher = dispatcher  # None notifies synchronously
+        self._observer_snapshot = ()
 
     def add_observer(self, observer):
         """Attach an observer"""
         self._observers.append(observer)
+        self._observer_snapshot = None
 
     def remove_observer(self, observer):
         """Detach an observer"""
         self._observers.remove(observer)
+        self._observer_snapshot = None
+        if self._dispatcher is not None:
+            self._dispatcher.forget(observer)
 
     def set_temperature(self, new_temperature):
         """Change temperature and notify observers"""
@@ -69,9 +270,97 @@ class WeatherStation(Subject):
 
     def notify_observers(self):
         """Notify all observers about the change"""
+        if self._dispatcher is not None:
+            if self._observer_snapshot is None:  # Rebuilt only after the observers change
+                self._observer_snapshot = tuple(self._observers)
+            self._dispatcher.publish(self._observer_snapshot, self._temperature)
+            return
         for observer in self._observers:
             observer.update(self._temperature)
 
+
+class _BenchmarkObserver(Observer):
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.temperature = None
+
+    def update(self, temperature):
+        if self.delay:
+            time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("display offline")
+        self.temperature = temperature
+
+
+def benchmark_notification(observers=10_000, slow=50, slow_delay=0.05, failing=20, updates=200,
+                           sensor_interval=0.005):
+    """set_temperature() latency with some slow and failing observers: synchronous vs dispatched"""
+    population = ([_BenchmarkObserver(slow_delay) for _ in range(slow)]
+                  + [_BenchmarkObserver(fail=True) for _ in range(failing)]
+                  + [_BenchmarkObserver() for _ in range(observers - slow - failing)])
+
+    station = WeatherStation()
+    for observer in population:
+        if not observer.fail:  # Synchronous notification has no isolation: one exception aborts the rest
+            station.add_observer(observer)
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        station.set_temperature(0)
+        elapsed = time.perf_counter() - started
+    print(f"  synchronous: one set_temperature() took {elapsed * 1000:.0f}ms")
+
+    dispatcher = ObserverDispatcher(timeout=slow_delay / 4)
+    station = WeatherStation(dispatcher)
+    for observer in population:
+        station.add_observer(observer)
+    latencies = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for temperature in range(1, updates + 1):
+            started = time.perf_counter()
+            station.set_temperature(temperature)
+            latencies.append(time.perf_counter() - started)
+            time.sleep(sensor_interval)
+    started = time.perf_counter()
+    dispatcher.wait_idle()
+    settled = time.perf_counter() - started
+    fast = [observer for observer in population if not observer.delay and not observer.fail]
+    assert all(observer.temperature == updates for observer in fast)
+    latencies.sort()
+    print(f"  dispatched: set_temperature() p50 {latencies[len(latencies) // 2] * 1e6:.0f}us, "
+          f"max {latencies[-1] * 1e6:.0f}us; all observers settled {settled * 1000:.0f}ms after the last update")
+    print(f"  {dispatcher.stats()}")
+    dispatcher.close()
+
+
+def _blocking_observer(release):
+    class BlockingObserver(Observer):
+        def update(self, temperature):
+            release.wait()
+    return BlockingObserver()
+
+
+def benchmark_stuck_observers(workers=2, timeout=0.1, stuck=2, fast=20, rounds=3):
+    """Observers that never return must not keep updates from reaching the others"""
+    release = threading.Event()
+    dispatcher = ObserverDispatcher(workers=workers, timeout=timeout)
+    population = [_blocking_observer(release) for _ in range(stuck)]
+    healthy = [_BenchmarkObserver() for _ in range(fast)]
+    observers = tuple(population + healthy)
+    for temperature in range(1, rounds + 1):
+        started = time.perf_counter()
+        dispatcher.publish(observers, temperature)
+        while any(observer.temperature != temperature for observer in healthy):
+            assert time.perf_counter() - started < 20 * timeout, f"update {temperature} starved: {dispatcher.stats()}"
+            time.sleep(timeout / 10)
+        print(f"  update {temperature}: {fast} healthy observers updated in "
+              f"{(time.perf_counter() - started) * 1000:.0f}ms with {stuck} observers stuck")
+    release.set()
+    dispatcher.wait_idle()
+    print(f"  {dispatcher.stats()}")
+    dispatcher.close()
+
+
 # Client Code
 if __name__ == "__main__":
     # Create Weather Station (Subject)
@@ -94,3 +383,16 @@ if __name__ == "__main__":
 
     # Change Temperature - Only PhoneDisplay gets updated
     weather_station.set_temperature(28)
+
+    # Dispatched notification: set_temperature() returns before the displays update
+    dispatcher = ObserverDispatcher(workers=1, timeout=0.5)
+    weather_station = WeatherStation(dispatcher)
+    weather_station.add_observer(phone_display)
+    weather_station.add_observer(led_panel)
+    weather_station.set_temperature(31)
+    dispatcher.wait_idle()
+    dispatcher.close()
+
+    print("\nNotification benchmark:")
+    benchmark_notification()
+    benchmark_stuck_observers()
@@ -12,6 +12,17 @@
 # ✅ Reduces Coupling: The client interacts with the facade instead of directly depending on multiple classes.
 # ✅ Improves Maintainability: Changes to the subsystem do not affect client code.
 
+# 🔹 Warm Pool
+# Powering devices on and setting their inputs is the slow part of every session.
+# A SubsystemWarmPool keeps recently used devices powered on after end_movie(), so a
+# back-to-back watch_movie() can skip on()/set_input(). Devices are switched off once they
+# sit idle longer than idle_timeout, or when more than max_warm devices are being kept warm.
+# A background timer fires when the oldest warm device expires, so idle devices are switched
+# off even if no other session ever starts; shutdown() cancels it.
+
+import threading
+import time
+from collections import deque
 
  # Subsystem Components
 class DVDPlayer:
@@ -51,33 +62,191 @@ class Lights:
     def dim(self, level):
         print(f"Lights dimmed to {level}%")
 
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of samples (None if there are none)"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    rank = max(1, -(-len(ordered) * pct // 100))  # ceil(len * pct / 100)
+    return ordered[int(rank) - 1]
+
+
+# Warm Pool: keeps recently used subsystems powered on between sessions
+class SubsystemWarmPool:
+    """Keeps idle devices powered on so the next session can reuse them"""
+
+    def __init__(self, max_warm=3, idle_timeout=300.0, clock=time.monotonic):
+        self.max_warm = max_warm
+        self.idle_timeout = idle_timeout
+        self.clock = clock
+        self._warm = {}  # id(device) -> (device, released_at), least recently released first
+        self._lock = threading.RLock()  # The idle timer evicts from its own thread
+        self._timer = None
+        self.hits = 0
+        self.misses = 0
+
+    def acquire(self, device):
+        """Takes a device out of the pool, returns True if it is still warm"""
+        with self._lock:
+            self.evict_idle()
+            if self._warm.pop(id(device), None) is not None:
+                self.hits += 1
+                return True
+            self.misses += 1
+            return False
+
+    def release(self, device):
+        """Keeps a device warm instead of switching it off"""
+        with self._lock:
+            self._warm.pop(id(device), None)
+            self._warm[id(device)] = (device, self.clock())
+            self.evict_idle()
+            while len(self._warm) > self.max_warm:
+                device, _ = self._warm.pop(next(iter(self._warm)))
+                device.off()
+            self._schedule_reaper()
+
+    def evict_idle(self):
+        """Switches off devices that have been idle longer than idle_timeout"""
+        with self._lock:
+            now = self.clock()
+            for key, (device, released_at) in list(self._warm.items()):
+                if now - released_at >= self.idle_timeout:
+                    del self._warm[key]
+                    device.off()
+
+    def _schedule_reaper(self):
+        """Arms the idle timer for the oldest warm device, called with the lock held"""
+        if self._timer is not None or not self._warm:
+            return
+        _, released_at = next(iter(self._warm.values()))
+        delay = max(released_at + self.idle_timeout - self.clock(), 0.001)
+        self._timer = threading.Timer(delay, self._reap)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _reap(self):
+        with self._lock:
+            self._timer = None
+            self.evict_idle()
+            self._schedule_reaper()
+
+    def shutdown(self):
+        """Switches off every warm device and stops the idle timer"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            for device, _ in self._warm.values():
+                device.off()
+            self._warm.clear()
+
+    def __len__(self):
+        return len(self._warm)
+
+
 # Facade Class
 class HomeTheaterFacade:
-    def __init__(self, dvd_player, projector, sound_system, lights):
+    def __init__(self, dvd_player, projector, sound_system, lights, warm_pool=None, latency_samples=1024):
         self.dvd_player = dvd_player
         self.projector = projector
         self.sound_system = sound_system
         self.lights = lights
+        self.warm_pool = warm_pool
+        # Seconds from watch_movie() to play(), most recent sessions only; sessions counts them all
+        self.ready_times = {kind: deque(maxlen=latency_samples) for kind in ("warm", "cold")}
+        self.sessions = {"warm": 0, "cold": 0}
+
+    def _is_warm(self, device):
+        if self.warm_pool is not None and self.warm_pool.acquire(device):
+            print(f"{type(device).__name__} is already warm")
+            return True
+        return False
 
     def watch_movie(self, movie):
         print("\n--- Starting Movie Night ---")
+        started = time.perf_counter()
         self.lights.dim(30)
-        self.projector.on()
-        self.projector.set_input("DVD Player")
-        self.sound_system.on()
+        warm = True
+        if not self._is_warm(self.projector):
+            self.projector.on()
+            self.projector.set_input("DVD Player")
+            warm = False
+        if not self._is_warm(self.sound_system):
+            self.sound_system.on()
+            warm = False
         self.sound_system.set_volume(10)
-        self.dvd_player.on()
+        if not self._is_warm(self.dvd_player):
+            self.dvd_player.on()
+            warm = False
+        kind = "warm" if warm else "cold"
+        self.ready_times[kind].append(time.perf_counter() - started)
+        self.sessions[kind] += 1
         self.dvd_player.play(movie)
         print("--- Enjoy Your Movie! ---\n")
 
     def end_movie(self):
         print("\n--- Stopping Movie Night ---")
-        self.dvd_player.off()
-        self.sound_system.off()
-        self.projector.off()
+        for device in (self.dvd_player, self.sound_system, self.projector):
+            if self.warm_pool is not None:
+                self.warm_pool.release(device)
+            else:
+                device.off()
         self.lights.dim(100)
         print("--- Movie Night Ended ---\n")
 
+    def report(self):
+        """Warm pool hit/miss counts and time-to-ready percentiles for warm vs cold sessions"""
+        stats = {
+            "hits": self.warm_pool.hits if self.warm_pool is not None else 0,
+            "misses": self.warm_pool.misses if self.warm_pool is not None else 0,
+        }
+        for kind, samples in self.ready_times.items():
+            stats[kind] = {
+                "sessions": self.sessions[kind],
+                "p50": percentile(samples, 50),
+                "p90": percentile(samples, 90),
+                "p99": percentile(samples, 99),
+            }
+        return stats
+
+
+def benchmark_warm_pool(sessions=20, startup_delay=0.01):
+    """Back-to-back sessions with slow-starting devices, with and without a warm pool"""
+    import contextlib
+    import io
+
+    class SlowProjector(Projector):
+        def on(self):
+            time.sleep(startup_delay)
+            super().on()
+
+    class SlowSoundSystem(SoundSystem):
+        def on(self):
+            time.sleep(startup_delay)
+            super().on()
+
+    class SlowDVDPlayer(DVDPlayer):
+        def on(self):
+            time.sleep(startup_delay)
+            super().on()
+
+    for label, pool in (("no pool", None), ("warm pool", SubsystemWarmPool(max_warm=3, idle_timeout=60))):
+        theater = HomeTheaterFacade(SlowDVDPlayer(), SlowProjector(), SlowSoundSystem(), Lights(), pool)
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(sessions):
+                theater.watch_movie("Inception")
+                theater.end_movie()
+            if pool is not None:
+                pool.shutdown()
+        stats = theater.report()
+        print(f"{label:>9}: hits={stats['hits']} misses={stats['misses']}")
+        for kind in ("cold", "warm"):
+            s = stats[kind]
+            if s["sessions"]:
+                print(f"           {kind}: {s['sessions']} sessions, "
+                      f"p50={s['p50'] * 1000:.2f}ms p90={s['p90'] * 1000:.2f}ms p99={s['p99'] * 1000:.2f}ms")
+
 
 # Client Code
 if __name__ == "__main__":
@@ -95,3 +264,22 @@ if __name__ == "__main__":
 
     # Use Facade to stop the movie
     home_theater.end_movie()
+
+    # Back-to-back sessions reuse the devices the pool kept warm
+    warm_theater = HomeTheaterFacade(dvd, projector, sound, lights, SubsystemWarmPool(max_warm=3, idle_timeout=60))
+    warm_theater.watch_movie("Inception")
+    warm_theater.end_movie()
+    warm_theater.watch_movie("Interstellar")  # Projector, sound system and DVD player are already warm
+    warm_theater.end_movie()
+    warm_theater.warm_pool.shutdown()
+    print(warm_theater.report())
+
+    # With no further sessions, the idle timer switches the devices off by itself
+    idle_theater = HomeTheaterFacade(dvd, projector, sound, lights, SubsystemWarmPool(max_warm=3, idle_timeout=0.2))
+    idle_theater.watch_movie("Inception")
+    idle_theater.end_movie()
+    time.sleep(0.3)  # Projector, sound system and DVD player are switched off meanwhile
+    print(f"Devices still warm after the idle timeout: {len(idle_theater.warm_pool)}")
+
+    print("\nWarm pool benchmark:")
+    benchmark_warm_pool()
@@ -14,50 +14,464 @@
 # Stores objects in a dictionary and reuses them when needed.
 # Reduces memory usage, improves performance, and is useful in large applications.
 
+# 🔹 Interning Pool
+# The pool holds flyweights through weak references, so a combination nobody uses any more
+# is reclaimed instead of living forever. Lookups of existing keys take no lock; only
+# creating a new flyweight does, and it re-checks the pool so two threads never create
+# two objects for the same key.
+
+# 🔹 Columnar Storage
+# A list of (flyweight, (row, col)) tuples costs well over 100 bytes per character even though
+# the flyweight itself is shared. CharacterColumns keeps three packed arrays instead: a small
+# integer id of the flyweight, the row and the column, i.e. 12 bytes per character.
+
+# 🔹 Piece Table
+# Inserting into the middle of a flat sequence moves every character after it. PieceTable
+# keeps the document as pieces (text, start, length, format) in an implicit treap ordered by
+# position, so insert and delete at any position split/merge O(log n) nodes. Formatting is
+# stored once per piece (a run-length span), and characters resolve to the shared
+# CharacterFlyweight only when they are read.
+
+# 🔹 Batched Rendering
+# Each flyweight formats its "'c' at " prefix and " [Font: ...]" suffix once, when it is
+# created. TextRenderer uses them to build output lines in large chunks and writes one chunk
+# at a time to the sink instead of calling print() once per character. It can stream any
+# range of positions lazily with iter_chunks().
+
+import io
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+import weakref
+from array import array
+
 
 class CharacterFlyweight:
     """Flyweight class: Stores shared properties of characters"""
-    _characters = {}
+    _characters = weakref.WeakValueDictionary()
+    _lock = threading.Lock()
+    _hits = 0  # best-effort under threads, the read path takes no lock
+    _misses = 0
 
     def __new__(cls, char, font="Arial", size=12, bold=False):
         key = (char, font, size, bold)
-        if key not in cls._characters:
-            cls._characters[key] = super(CharacterFlyweight, cls).__new__(cls)
-            cls._characters[key].char = char
-            cls._characters[key].font = font
-            cls._characters[key].size = size
-            cls._characters[key].bold = bold
-        return cls._characters[key]
+        character = cls._characters.get(key)  # Lock-free read path
+        if character is not None:
+            cls._hits += 1
+            return character
+        with cls._lock:
+            character = cls._characters.get(key)  # Another thread may have created it
+            if character is None:
+                character = super(CharacterFlyweight, cls).__new__(cls)
+                character.char = char
+                character.font = font
+                character.size = size
+                character.bold = bold
+                character.prefix = f"'{char}' at "
+                character.suffix = f" [Font: {font}, Size: {size}, Bold: {bold}]"
+                cls._characters[key] = character
+                cls._misses += 1
+            else:
+                cls._hits += 1
+        return character
+
+    @classmethod
+    def stats(cls):
+        """Live flyweight count and hit rate of the interning pool"""
+        lookups = cls._hits + cls._misses
+        return {
+            "live": len(cls._characters),
+            "hits": cls._hits,
+            "misses": cls._misses,
+            "hit_rate": cls._hits / lookups if lookups else 0.0,
+        }
 
     def display(self, position):
-        return f"'{self.char}' at {position} [Font: {self.font}, Size: {self.size}, Bold: {self.bold}]"
+        return f"{self.prefix}{position}{self.suffix}"
+
+
+# Columnar store for the characters of a document
+class CharacterColumns:
+    """Stores (flyweight, (row, col)) entries as packed arrays"""
+
+    def __init__(self):
+        self._flyweights = []  # id -> flyweight, also keeps used flyweights alive in the pool
+        self._flyweight_ids = {}  # flyweight -> id
+        self._ids = array("I")
+        self._rows = array("I")
+        self._cols = array("I")
+
+    def _id_of(self, flyweight):
+        flyweight_id = self._flyweight_ids.get(flyweight)
+        if flyweight_id is None:
+            flyweight_id = self._flyweight_ids[flyweight] = len(self._flyweights)
+            self._flyweights.append(flyweight)
+        return flyweight_id
+
+    def append(self, flyweight, position):
+        row, col = position
+        self._ids.append(self._id_of(flyweight))
+        self._rows.append(row)
+        self._cols.append(col)
+
+    def extend(self, entries):
+        """Bulk append of (flyweight, (row, col)) entries"""
+        ids, rows, cols = array("I"), array("I"), array("I")
+        for flyweight, (row, col) in entries:
+            ids.append(self._id_of(flyweight))
+            rows.append(row)
+            cols.append(col)
+        self._ids.extend(ids)
+        self._rows.extend(rows)
+        self._cols.extend(cols)
+
+    def chunk(self, start, stop):
+        """Copies of the id/row/col columns for positions start..stop"""
+        return self._ids[start:stop], self._rows[start:stop], self._cols[start:stop]
+
+    def flyweight(self, flyweight_id):
+        return self._flyweights[flyweight_id]
+
+    def entry(self, index):
+        return self._flyweights[self._ids[index]], (self._rows[index], self._cols[index])
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return CharacterView(self, range(len(self))[index])
+        return self.entry(index)
+
+    def __iter__(self):
+        flyweights = self._flyweights
+        for flyweight_id, row, col in zip(self._ids, self._rows, self._cols):
+            yield flyweights[flyweight_id], (row, col)
+
+
+class CharacterView:
+    """Slice of a CharacterColumns store that reads through without copying"""
+
+    def __init__(self, columns, indices):
+        self._columns = columns
+        self._indices = indices
+
+    def __len__(self):
+        return len(self._indices)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return CharacterView(self._columns, self._indices[index])
+        return self._columns.entry(self._indices[index])
+
+    def __iter__(self):
+        for index in self._indices:
+            yield self._columns.entry(index)
 
 
 # Client: Uses the flyweight objects
 class TextEditor:
     def __init__(self):
-        self.characters = []
+        self.characters = CharacterColumns()
 
     def add_character(self, char, position, font="Arial", size=12, bold=False):
         character = CharacterFlyweight(char, font, size, bold)  # Flyweight object
-        self.characters.append((character, position))
+        self.characters.append(character, position)
+
+    def add_text(self, text, position=(0, 0), font="Arial", size=12, bold=False):
+        """Bulk append: lays out text from position, a newline starts the next row"""
+        def entries():
+            row, col = position
+            for char in text:
+                if char == "\n":
+                    row, col = row + 1, 0
+                    continue
+                yield CharacterFlyweight(char, font, size, bold), (row, col)
+                col += 1
+
+        self.characters.extend(entries())
+
+    def display_text(self, start=0, stop=None, sink=None):
+        TextRenderer(sink).render(self.characters, start, stop)
+
+
+# Renders a CharacterColumns store in large chunks
+class TextRenderer:
+    """Streams display lines to a buffered sink, one chunk per write"""
+
+    def __init__(self, sink=None, chunk_chars=8192):
+        self.sink = sink if sink is not None else sys.stdout
+        self.chunk_chars = chunk_chars
+
+    def iter_chunks(self, characters, start=0, stop=None):
+        """Lazily yields the display text of positions start..stop, chunk_chars lines at a time"""
+        start, stop, _ = slice(start, stop).indices(len(characters))
+        lines = {}  # flyweight id -> (prefix, suffix)
+        for chunk_start in range(start, stop, self.chunk_chars):
+            ids, rows, cols = characters.chunk(chunk_start, min(chunk_start + self.chunk_chars, stop))
+            parts = []
+            for flyweight_id, row, col in zip(ids, rows, cols):
+                affixes = lines.get(flyweight_id)
+                if affixes is None:
+                    flyweight = characters.flyweight(flyweight_id)
+                    affixes = lines[flyweight_id] = (flyweight.prefix + "(", ")" + flyweight.suffix + "\n")
+                parts.append(f"{affixes[0]}{row}, {col}{affixes[1]}")
+            yield "".join(parts)
+
+    def render(self, characters, start=0, stop=None):
+        """Writes positions start..stop to the sink, returns the number of characters rendered"""
+        start, stop, _ = slice(start, stop).indices(len(characters))
+        for chunk in self.iter_chunks(characters, start, stop):
+            self.sink.write(chunk)
+        self.sink.flush()
+        return max(0, stop - start)
+
+
+# Piece Table: a piece is a node of an implicit treap keyed by character offset
+class _Piece:
+    __slots__ = ("text", "start", "length", "style", "priority", "left", "right", "size")
+
+    def __init__(self, text, start, length, style, priority=None):
+        self.text = text
+        self.start = start
+        self.length = length
+        self.style = style  # (font, size, bold) shared by every character in the piece
+        self.priority = random.random() if priority is None else priority
+        self.left = None
+        self.right = None
+        self.size = length  # characters in this subtree
+
+    def update(self):
+        self.size = self.length + _size(self.left) + _size(self.right)
+
+
+def _size(piece):
+    return piece.size if piece is not None else 0
+
+
+def _split(piece, pos):
+    """Splits a subtree into its first pos characters and the rest"""
+    if piece is None:
+        return None, None
+    left_size = _size(piece.left)
+    if pos <= left_size:
+        first, rest = _split(piece.left, pos)
+        piece.left = rest
+        piece.update()
+        return first, piece
+    if pos >= left_size + piece.length:
+        first, rest = _split(piece.right, pos - left_size - piece.length)
+        piece.right = first
+        piece.update()
+        return piece, rest
+    # The split point falls inside this piece: cut it in two, the tail keeps the priority
+    offset = pos - left_size
+    tail = _Piece(piece.text, piece.start + offset, piece.length - offset, piece.style, piece.priority)
+    tail.right, piece.right = piece.right, None
+    piece.length = offset
+    tail.update()
+    piece.update()
+    return piece, tail
+
+
+def _merge(first, rest):
+    """Concatenates two subtrees"""
+    if first is None or rest is None:
+        return first or rest
+    if first.priority > rest.priority:
+        first.right = _merge(first.right, rest)
+        first.update()
+        return first
+    rest.left = _merge(first, rest.left)
+    rest.update()
+    return rest
+
+
+def _pieces(piece):
+    """In-order walk of the pieces"""
+    stack = []
+    while stack or piece is not None:
+        while piece is not None:
+            stack.append(piece)
+            piece = piece.left
+        piece = stack.pop()
+        yield piece
+        piece = piece.right
+
+
+class PieceTable:
+    """Text buffer with O(log n) insert/delete and run-length formatting"""
+
+    def __init__(self, text="", font="Arial", size=12, bold=False):
+        self._styles = {}  # Shares one style tuple between all pieces with the same format
+        self._root = None
+        if text:
+            self.insert(0, text, font, size, bold)
+
+    def __len__(self):
+        return _size(self._root)
+
+    def insert(self, index, text, font="Arial", size=12, bold=False):
+        if not text:
+            return
+        style = self._styles.setdefault((font, size, bold), (font, size, bold))
+        first, rest = _split(self._root, index)
+        self._root = _merge(_merge(first, _Piece(text, 0, len(text), style)), rest)
+
+    def delete(self, index, length):
+        first, rest = _split(self._root, index)
+        _, rest = _split(rest, length)
+        self._root = _merge(first, rest)
+
+    def character_at(self, index):
+        """Returns the shared CharacterFlyweight at index"""
+        if not 0 <= index < len(self):
+            raise IndexError("PieceTable index out of range")
+        piece = self._root
+        while True:
+            left_size = _size(piece.left)
+            if index < left_size:
+                piece = piece.left
+            elif index < left_size + piece.length:
+                char = piece.text[piece.start + index - left_size]
+                return CharacterFlyweight(char, *piece.style)
+            else:
+                index -= left_size + piece.length
+                piece = piece.right
+
+    def text(self):
+        return "".join(piece.text[piece.start:piece.start + piece.length] for piece in _pieces(self._root))
+
+    def format_runs(self):
+        """Yields (start, length, (font, size, bold)) spans, adjacent equal formats merged"""
+        start, length, style = 0, 0, None
+        for piece in _pieces(self._root):
+            if piece.style is style:
+                length += piece.length
+                continue
+            if length:
+                yield start, length, style
+            start, length, style = start + length, piece.length, piece.style
+        if length:
+            yield start, length, style
+
+
+def benchmark_random_edits(doc_bytes=2_000_000, edits=2_000, list_edits=200):
+    """Random insert/delete workload on a multi-megabyte document"""
+    rng = random.Random(42)
+    document = ("lorem ipsum dolor sit amet " * (doc_bytes // 27 + 1))[:doc_bytes]
+
+    table = PieceTable(document)
+    started = time.perf_counter()
+    for _ in range(edits):
+        position = rng.randrange(len(table))
+        if rng.random() < 0.5:
+            table.insert(position, "edit", bold=True)
+        else:
+            table.delete(position, 4)
+    table_rate = edits / (time.perf_counter() - started)
+
+    characters = [CharacterFlyweight(char) for char in document]
+    started = time.perf_counter()
+    for _ in range(list_edits):
+        position = rng.randrange(len(characters))
+        if rng.random() < 0.5:
+            characters[position:position] = [CharacterFlyweight(char, bold=True) for char in "edit"]
+        else:
+            del characters[position:position + 4]
+    list_rate = list_edits / (time.perf_counter() - started)
+
+    print(f"{doc_bytes / 1e6:.0f} MB document, random edits:")
+    print(f"list of flyweights: {list_rate:,.0f} edits/sec")
+    print(f"piece table       : {table_rate:,.0f} edits/sec")
+
+
+def benchmark_rendering(chars=200_000):
+    """Rendering throughput in chars/sec: print per character vs TextRenderer"""
+    editor = TextEditor()
+    editor.add_text(("The quick brown fox jumps over the lazy dog.\n" * (chars // 45 + 1))[:chars])
+    chars = len(editor.characters)
+
+    with open(os.devnull, "w") as sink:
+        started = time.perf_counter()
+        for character, position in editor.characters:
+            print(f"'{character.char}' at {position} [Font: {character.font}, Size: {character.size}, "
+                  f"Bold: {character.bold}]", file=sink, flush=True)
+        print_rate = chars / (time.perf_counter() - started)
+
+    with io.BufferedWriter(io.FileIO(os.devnull, "w"), buffer_size=1 << 16) as raw:
+        sink = io.TextIOWrapper(raw, write_through=False)
+        started = time.perf_counter()
+        TextRenderer(sink).render(editor.characters)
+        renderer_rate = chars / (time.perf_counter() - started)
+
+    print(f"print per character: {print_rate:,.0f} chars/sec")
+    print(f"TextRenderer       : {renderer_rate:,.0f} chars/sec")
+
+
+def benchmark_memory(chars=200_000):
+    """tracemalloc bytes per character: list of tuples vs columnar arrays"""
+    text = ("The quick brown fox jumps over the lazy dog. " * (chars // 45 + 1))[:chars]
+
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    tuples = [(CharacterFlyweight(char), (0, col)) for col, char in enumerate(text)]
+    list_bytes = tracemalloc.get_traced_memory()[0] - baseline
+    del tuples
+
+    baseline = tracemalloc.get_traced_memory()[0]
+    columnar = TextEditor()
+    columnar.add_text(text)
+    columnar_bytes = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+
+    print(f"list of tuples: {list_bytes / chars:.1f} bytes/char")
+    print(f"columnar      : {columnar_bytes / chars:.1f} bytes/char")
+
+
+if __name__ == "__main__":
+    # Test Flyweight Pattern
+    editor = TextEditor()
+    editor.add_character("H", (0, 0))
+    editor.add_character("e", (0, 1))
+    editor.add_character("l", (0, 2))
+    editor.add_character("l", (0, 3))  # 'l' is reused instead of creating a new object
+    editor.add_character("o", (0, 4))
+    editor.add_character("!", (0, 5))
+
+    print("\nDisplaying text:\n")
+    editor.display_text()
+
+    # Checking memory optimization
+    print("\nTotal unique objects created:", len(CharacterFlyweight._characters))
+
+    # Flyweights nobody references any more are reclaimed by the pool
+    CharacterFlyweight("Z", "Courier", 99, True)
+    print("Live flyweights after a temporary one:", CharacterFlyweight.stats()["live"])
+    print("Interning pool stats:", CharacterFlyweight.stats())
 
-    def display_text(self):
-        for character, position in self.characters:
-            print(character.display(position))
+    # Bulk append and slice views read through the same columnar store
+    editor.add_text("World", (1, 0), bold=True)
+    print("\nSecond row:")
+    editor.display_text(start=6)
 
+    print("\nMemory per character:")
+    benchmark_memory()
 
-# Test Flyweight Pattern
-editor = TextEditor()
-editor.add_character("H", (0, 0))
-editor.add_character("e", (0, 1))
-editor.add_character("l", (0, 2))
-editor.add_character("l", (0, 3))  # 'l' is reused instead of creating a new object
-editor.add_character("o", (0, 4))
-editor.add_character("!", (0, 5))
+    # Piece table: insert and delete anywhere, formatting kept as runs
+    document = PieceTable("Hello World")
+    document.insert(6, "Big ", bold=True)
+    document.delete(0, 1)
+    document.insert(0, "J")
+    print("\nPiece table text:", document.text())
+    print("Format runs:", list(document.format_runs()))
+    print("Character 5:", document.character_at(5).display(5))
 
-print("\nDisplaying text:\n")
-editor.display_text()
+    print()
+    benchmark_random_edits()
 
-# Checking memory optimization
-print("\nTotal unique objects created:", len(CharacterFlyweight._characters))
+    print("\nRendering throughput:")
+    benchmark_rendering()
@@ -1,4 +1,12 @@
+import asyncio
+import copy
+import threading
+import time
 from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 class Internet(ABC):
     """Abstract Subject that defines the interface for real and proxy classes"""
@@ -13,18 +21,629 @@ class RealInternet(Internet):
     def connect_to(self, website):
         return f"Connected to {website}"
 
+class VirtualProxy:
+    """Virtual Proxy: builds the real subject on first use and forwards attribute access to it
+
+    Concurrent first calls wait on one factory() call. prewarm=True builds the subject on a
+    background thread right away. With idle_release set, a subject that has not been called
+    for that many seconds is dropped and built again on the next call.
+    """
+
+    def __init__(self, factory, prewarm=False, idle_release=None, clock=time.monotonic):
+        self._factory = factory
+        self._clock = clock
+        self._subject = None
+        self._lock = threading.Lock()
+        self._active = 0  # Calls in progress, the subject is never released under them
+        self._last_used = clock()
+        self._stopped = threading.Event()
+        self.initializations = 0
+        if prewarm:
+            threading.Thread(target=self._get_subject, daemon=True).start()
+        if idle_release is not None:
+            threading.Thread(target=self._release_when_idle, args=(idle_release,), daemon=True).start()
+
+    def _get_subject(self):
+        subject = self._subject
+        if subject is None:
+            with self._lock:
+                if self._subject is None:
+                    self._subject = self._factory()
+                    self.initializations += 1
+                subject = self._subject
+        return subject
+
+    def __getattr__(self, name):
+        attribute = getattr(self._get_subject(), name)
+        if not callable(attribute):
+            return attribute
+
+        def call(*args, **kwargs):
+            with self._lock:
+                self._active += 1
+            try:
+                return attribute(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    self._last_used = self._clock()
+
+        return call
+
+    def _release_when_idle(self, idle_release):
+        while not self._stopped.wait(idle_release / 2):
+            with self._lock:
+                if self._active == 0 and self._clock() - self._last_used >= idle_release:
+                    self._subject = None
+
+    @property
+    def is_initialized(self):
+        return self._subject is not None
+
+    def close(self):
+        """Stops the idle-release thread"""
+        self._stopped.set()
+
+
+class DomainBlocklist:
+    """Immutable set of domain rules, matched label by label from the right
+
+    Rule syntax:
+        example.com     blocks example.com and every subdomain of it
+        *.example.com   blocks subdomains of example.com only
+        =example.com    blocks exactly example.com
+
+    Each rule is stored as the 64-bit hash of its tagged domain in one sorted array, about
+    8 bytes per rule. A lookup bisects the array once per suffix of the host, so it costs
+    O(labels * log rules), a logarithmic probe instead of a hash set's O(1) in exchange for the
+    compact layout. A hash collision can block a host by mistake, which at 64 bits and a
+    million rules is vanishingly unlikely.
+    """
+
+    def __init__(self, rules=()):
+        hashes = set()
+        for rule in rules:
+            rule = rule.strip().lower().rstrip(".")
+            if not rule or rule.startswith("#"):
+                continue
+            if rule.startswith("*."):
+                hashes.add(hash("*" + rule[2:]))
+            elif rule.startswith("="):
+                hashes.add(hash("=" + rule[1:]))
+            else:
+                hashes.add(hash("." + rule))
+        self._hashes = array("q", sorted(hashes))
+
+    @classmethod
+    def from_file(cls, path):
+        """Bulk-loads one rule per line, blank lines and # comments are skipped"""
+        with open(path, encoding="utf-8") as rules:
+            return cls(rules)
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def _contains(self, key):
+        hashes, key_hash = self._hashes, hash(key)
+        index = bisect_left(hashes, key_hash)
+        return index < len(hashes) and hashes[index] == key_hash
+
+    def is_blocked(self, website):
+        host = website.lower().rstrip(".")
+        if self._contains("=" + host) or self._contains("." + host):
+            return True
+        dot = host.find(".")
+        while dot != -1:
+            parent = host[dot + 1:]
+            if self._contains("." + parent) or self._contains("*" + parent):
+                return True
+            dot = host.find(".", dot + 1)
+        return False
+
+
 class ProxyInternet(Internet):
     """Proxy: Controls access to certain websites"""
 
-    def __init__(self):
-        self.real_internet = RealInternet()
-        self.blocked_websites = {"facebook.com", "youtube.com", "twitter.com"}
+    def __init__(self, blocklist=None):
+        self.real_internet = VirtualProxy(RealInternet)  # Built on the first allowed request
+        if blocklist is None:
+            blocklist = DomainBlocklist(["facebook.com", "youtube.com", "twitter.com"])
+        self.blocklist = blocklist
+
+    def load_blocklist(self, path):
+        """Builds a new blocklist from a file and swaps it in; lookups never wait for the load"""
+        self.blocklist = DomainBlocklist.from_file(path)
 
     def connect_to(self, website):
-        if website in self.blocked_websites:
+        if self.blocklist.is_blocked(website):
             return f"Access Denied to {website} (Blocked by Proxy)"
         return self.real_internet.connect_to(website)
 
+class _Flight:
+    """One upstream call that concurrent misses for the same website wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+        self.error = None
+
+
+def _fresh(error):
+    """A copy of an exception without its traceback, or the exception itself if it can't be copied"""
+    try:
+        return copy.copy(error)
+    except Exception:  # e.g. an __init__ whose signature doesn't match args
+        return error
+
+
+class CachingProxyInternet(Internet):
+    """Caching Proxy: LRU cache with per-entry TTL, negative caching and coalesced misses"""
+
+    def __init__(self, internet=None, max_entries=1024, ttl=60.0, negative_ttl=5.0, clock=time.monotonic):
+        self.internet = internet if internet is not None else RealInternet()
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl  # Failures are cached too, for a shorter time
+        self.clock = clock
+        self._cache = OrderedDict()  # website -> (expires_at, response, error), least recently used first
+        self._flights = {}  # website -> _Flight of the upstream call in progress
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0  # Misses that waited on another caller's upstream call
+        self.bytes_saved = 0
+
+    def connect_to(self, website):
+        with self._lock:
+            entry = self._cache.get(website)
+            if entry is not None and entry[0] > self.clock():
+                self._cache.move_to_end(website)
+                self.hits += 1
+                return self._answer(entry[1], entry[2])
+            if entry is not None:
+                del self._cache[website]  # Expired
+            flight = self._flights.get(website)
+            leader = flight is None
+            if leader:
+                flight = self._flights[website] = _Flight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+        if leader:
+            return self._fetch(website, flight)
+        flight.done.wait()
+        with self._lock:
+            return self._answer(flight.response, flight.error)
+
+    def _fetch(self, website, flight):
+        cacheable = True
+        try:
+            flight.response = self.internet.connect_to(website)
+        except BaseException as error:
+            flight.error = _fresh(error)  # Cached without a traceback that would keep frames alive
+            cacheable = isinstance(error, Exception)  # Interrupts are passed on, never cached
+            raise
+        finally:
+            # Always finish the flight, or every later caller for this website waits forever
+            with self._lock:
+                if cacheable:
+                    ttl = self.ttl if flight.error is None else self.negative_ttl
+                    self._cache[website] = (self.clock() + ttl, flight.response, flight.error)
+                    self._cache.move_to_end(website)
+                    while len(self._cache) > self.max_entries:
+                        self._cache.popitem(last=False)
+                del self._flights[website]
+            flight.done.set()
+        return flight.response
+
+    def _answer(self, response, error):
+        """Replays a cached response or failure, called with the lock held"""
+        if error is not None:
+            raise _fresh(error)  # A fresh exception per caller, so tracebacks never pile up
+        self.bytes_saved += len(response.encode())
+        return response
+
+    def stats(self):
+        requests = self.hits + self.misses + self.coalesced
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": (self.hits + self.coalesced) / requests if requests else 0.0,
+            "bytes_saved": self.bytes_saved,
+        }
+
+
+class SlowInternet(Internet):
+    """Local stand-in upstream with injected latency and failures"""
+
+    def __init__(self, latency=0.005, failing=()):
+        self.latency = latency
+        self.failing = set(failing)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def connect_to(self, website):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        if website in self.failing:
+            raise ConnectionError(f"Could not reach {website}")
+        return f"Connected to {website} " + "<html>...</html>" * 64
+
+
+class _BucketShard:
+    """Token buckets of the clients that hash to one shard, guarded by the shard's own lock"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.slots = {}  # client -> index into tokens/stamps
+        self.tokens = array("d")
+        self.stamps = array("d")  # When tokens was last brought up to date
+        self.free = []  # Slots released by evicted clients
+        self.allowed = 0
+        self.denied = 0
+        self.swept_at = 0  # Number of clients at the last idle sweep
+
+
+class TokenBucketRateLimiter:
+    """Per-client token buckets: rate tokens/sec refill, up to capacity
+
+    Bucket state is two floats in packed arrays. Refill is computed lazily from the elapsed
+    time when a client makes a request. Clients are spread over lock-striped shards, so
+    threads deciding for different clients rarely contend. A bucket idle long enough to be
+    full again is the same as a new one, so such buckets are evicted without changing any
+    decision.
+    """
+
+    def __init__(self, rate=10.0, capacity=20.0, shards=64, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.idle_after = capacity / rate  # Seconds until an untouched bucket is full
+        self._shards = [_BucketShard() for _ in range(shards)]
+
+    def allow(self, client, cost=1.0):
+        shard = self._shards[hash(client) % len(self._shards)]
+        now = self.clock()
+        with shard.lock:
+            slot = shard.slots.get(client)
+            if slot is None:
+                if shard.free:
+                    slot = shard.free.pop()
+                else:
+                    slot = len(shard.tokens)
+                    shard.tokens.append(0.0)
+                    shard.stamps.append(0.0)
+                shard.slots[client] = slot
+                tokens = self.capacity
+            else:
+                tokens = min(self.capacity, shard.tokens[slot] + (now - shard.stamps[slot]) * self.rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+                shard.allowed += 1
+            else:
+                shard.denied += 1
+            shard.tokens[slot] = tokens
+            shard.stamps[slot] = now
+            if len(shard.slots) >= 2 * shard.swept_at + 1024:
+                self._evict_idle(shard, now)
+        return allowed
+
+    def _evict_idle(self, shard, now):
+        """Drops buckets that have refilled completely, called with the shard lock held"""
+        for client, slot in list(shard.slots.items()):
+            if now - shard.stamps[slot] >= self.idle_after:
+                del shard.slots[client]
+                shard.free.append(slot)
+        shard.swept_at = len(shard.slots)
+
+    def evict_idle(self):
+        now = self.clock()
+        for shard in self._shards:
+            with shard.lock:
+                self._evict_idle(shard, now)
+
+    def stats(self):
+        return {
+            "clients": sum(len(shard.slots) for shard in self._shards),
+            "allowed": sum(shard.allowed for shard in self._shards),
+            "denied": sum(shard.denied for shard in self._shards),
+        }
+
+
+class RateLimitingProxyInternet(Internet):
+    """Rate-Limiting Proxy: forwards a client's request only while its bucket has tokens"""
+
+    def __init__(self, internet=None, limiter=None):
+        self.internet = internet if internet is not None else RealInternet()
+        self.limiter = limiter if limiter is not None else TokenBucketRateLimiter()
+
+    def connect_to(self, website, client="anonymous"):
+        if not self.limiter.allow(client):
+            return f"Rate limit exceeded for {client} (Blocked by Proxy)"
+        return self.internet.connect_to(website)
+
+
+class HostConnectionPool:
+    """Keep-alive connections to one upstream host, at most max_connections open at once"""
+
+    def __init__(self, host, port, max_connections=10, connect_timeout=5.0, idle_timeout=30.0):
+        self.host = host
+        self.port = port
+        self.connect_timeout = connect_timeout
+        self.idle_timeout = idle_timeout
+        self._slots = asyncio.Semaphore(max_connections)  # Callers over the limit queue here
+        self._idle = []  # (reader, writer, idle_since), most recently used last
+        self.opened = 0
+        self.reused = 0
+
+    async def acquire(self, timeout):
+        await asyncio.wait_for(self._slots.acquire(), timeout)
+        now = asyncio.get_running_loop().time()
+        while self._idle:
+            reader, writer, idle_since = self._idle.pop()
+            if now - idle_since < self.idle_timeout and not writer.is_closing() and not reader.at_eof():
+                self.reused += 1
+                return reader, writer
+            writer.close()
+        try:
+            connection = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.connect_timeout)
+        except BaseException:
+            self._slots.release()
+            raise
+        self.opened += 1
+        return connection
+
+    def release(self, reader, writer, reusable):
+        if reusable:
+            self._idle.append((reader, writer, asyncio.get_running_loop().time()))
+        else:
+            writer.close()
+        self._slots.release()
+
+    def close(self):
+        for _, writer, _ in self._idle:
+            writer.close()
+        self._idle.clear()
+
+
+class AsyncRealInternet(Internet):
+    """Real Subject over asyncio: HTTP/1.1 GETs through per-host keep-alive connection pools"""
+
+    def __init__(self, max_connections_per_host=10, acquire_timeout=10.0, request_timeout=10.0, idle_timeout=30.0):
+        self.max_connections_per_host = max_connections_per_host
+        self.acquire_timeout = acquire_timeout  # How long a request may queue for a connection
+        self.request_timeout = request_timeout
+        self.idle_timeout = idle_timeout
+        self.pools = {}  # (host, port) -> HostConnectionPool
+
+    @staticmethod
+    def parse(website):
+        """Splits "[scheme://]host[:port][/path]" into (host, port, "host[:port]", "/path")"""
+        address = website.split("://", 1)[-1]
+        host_port, _, path = address.partition("/")
+        host, _, port = host_port.partition(":")
+        return host, int(port or 80), host_port, "/" + path
+
+    async def connect_to(self, website):
+        host, port, host_port, path = self.parse(website)
+        pool = self.pools.get((host, port))
+        if pool is None:
+            pool = self.pools[host, port] = HostConnectionPool(
+                host, port, self.max_connections_per_host, idle_timeout=self.idle_timeout)
+        reader, writer = await pool.acquire(self.acquire_timeout)
+        reusable = False
+        try:
+            status, body, reusable = await asyncio.wait_for(
+                self._get(reader, writer, host_port, path), self.request_timeout)
+        finally:
+            pool.release(reader, writer, reusable)
+        return f"Connected to {website} (HTTP {status}, {len(body)} bytes)"
+
+    @staticmethod
+    async def _get(reader, writer, host, path):
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: keep-alive\r\n\r\n".encode())
+        await writer.drain()
+        while True:
+            status = int((await reader.readline()).split()[1])
+            headers = {}
+            while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            if status >= 200 or status == 101:
+                break  # Other 1xx responses are interim, the real one follows
+        keep_alive = headers.get("connection", "").lower() != "close"
+        if 100 <= status < 200 or status in (204, 304):
+            return status, b"", keep_alive
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            return status, await AsyncRealInternet._read_chunked(reader), keep_alive
+        if "content-length" in headers:
+            return status, await reader.readexactly(int(headers["content-length"])), keep_alive
+        if not keep_alive:
+            return status, await reader.read(), False  # Body ends when the server closes
+        raise ConnectionError(f"HTTP {status} response has no length on a keep-alive connection")
+
+    @staticmethod
+    async def _read_chunked(reader):
+        body = bytearray()
+        while size := int((await reader.readline()).split(b";")[0], 16):
+            body += await reader.readexactly(size)
+            await reader.readexactly(2)  # CRLF after the chunk
+        while await reader.readline() not in (b"\r\n", b"\n", b""):
+            pass  # Trailer fields
+        return bytes(body)
+
+    def close(self):
+        for pool in self.pools.values():
+            pool.close()
+
+
+class AsyncProxyInternet(ProxyInternet):
+    """Proxy over an async Internet: checks the blocklist, then awaits the upstream"""
+
+    def __init__(self, internet=None, blocklist=None):
+        super().__init__(blocklist)
+        self.real_internet = internet if internet is not None else AsyncRealInternet()
+
+    async def connect_to(self, website):
+        host, *_ = AsyncRealInternet.parse(website)  # Match the host that would be connected to
+        if self.blocklist.is_blocked(host):
+            return f"Access Denied to {website} (Blocked by Proxy)"
+        return await self.real_internet.connect_to(website)
+
+    async def connect_many(self, websites):
+        """Drives all requests concurrently, results in the order of websites"""
+        return await asyncio.gather(*(self.connect_to(website) for website in websites))
+
+
+async def start_stand_in_server(latency=0.005, body=b"<html>...</html>" * 64):
+    """Local keep-alive HTTP server that answers every GET after latency seconds"""
+
+    async def handle(reader, writer):
+        try:
+            while await reader.readline():
+                while await reader.readline() not in (b"\r\n", b"\n", b""):
+                    pass
+                await asyncio.sleep(latency)
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: %d\r\nConnection: keep-alive\r\n\r\n" % len(body))
+                writer.write(body)
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass  # Client went away, or the loop is shutting down
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, "127.0.0.1", 0)
+
+
+def benchmark_async_proxy(requests=5_000, concurrency=500, max_connections=100, latency=0.005):
+    """Requests/sec and p99 latency through AsyncProxyInternet against the stand-in server"""
+
+    async def run():
+        server = await start_stand_in_server(latency)
+        port = server.sockets[0].getsockname()[1]
+        upstream = AsyncRealInternet(max_connections_per_host=max_connections)
+        proxy = AsyncProxyInternet(upstream)
+        gate = asyncio.Semaphore(concurrency)
+        latencies = []
+
+        async def one(i):
+            async with gate:
+                started = time.perf_counter()
+                await proxy.connect_to(f"127.0.0.1:{port}/page/{i}")
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        elapsed = time.perf_counter() - started
+        pool = upstream.pools["127.0.0.1", port]
+        upstream.close()
+        server.close()
+        await server.wait_closed()
+        latencies.sort()
+        p99 = latencies[int(len(latencies) * 0.99) - 1]
+        print(f"{requests / elapsed:,.0f} req/sec, p99 {p99 * 1000:.1f}ms "
+              f"({pool.opened} connections opened, {pool.reused} reused)")
+
+    asyncio.run(run())
+
+
+def benchmark_virtual_proxy(init_seconds=0.2, callers=8):
+    """Startup time and first-call latency of a slow-to-build subject, eager vs virtual"""
+
+    class HeavyInternet(RealInternet):
+        def __init__(self):
+            time.sleep(init_seconds)
+
+    started = time.perf_counter()
+    eager = HeavyInternet()
+    startup = time.perf_counter() - started
+    started = time.perf_counter()
+    eager.connect_to("google.com")
+    print(f"eager          : startup {startup * 1000:6.1f}ms, first call {(time.perf_counter() - started) * 1000:6.1f}ms")
+
+    for label, prewarm in (("virtual", False), ("virtual+prewarm", True)):
+        started = time.perf_counter()
+        lazy = VirtualProxy(HeavyInternet, prewarm=prewarm)
+        startup = time.perf_counter() - started
+        time.sleep(init_seconds * 1.5)  # The client does other work before its first request
+        started = time.perf_counter()
+        with ThreadPoolExecutor(callers) as pool:
+            list(pool.map(lambda _: lazy.connect_to("google.com"), range(callers)))
+        first_call = time.perf_counter() - started
+        print(f"{label:<15}: startup {startup * 1000:6.1f}ms, first call {first_call * 1000:6.1f}ms "
+              f"({callers} concurrent callers, {lazy.initializations} initialization)")
+
+
+def benchmark_rate_limiter(clients=1_000_000, decisions=500_000, threads=4):
+    """Overhead per decision and allow/deny counts over many clients"""
+    import random
+
+    rng = random.Random(5)
+    workload = [f"client-{rng.randrange(clients)}" for _ in range(decisions)]
+    limiter = TokenBucketRateLimiter(rate=1.0, capacity=2.0)
+
+    started = time.perf_counter()
+    for client in workload:
+        limiter.allow(client)
+    elapsed = time.perf_counter() - started
+    print(f"1 thread : {elapsed / decisions * 1e9:,.0f} ns/decision")
+
+    chunks = [workload[i::threads] for i in range(threads)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(lambda chunk: [limiter.allow(client) for client in chunk], chunks))
+    elapsed = time.perf_counter() - started
+    print(f"{threads} threads: {elapsed / decisions * 1e9:,.0f} ns/decision")
+    print(f"          {limiter.stats()}")
+
+
+def benchmark_caching_proxy(requests=2_000, sites=100, workers=16, latency=0.005):
+    """Skewed workload over a slow upstream, with and without the caching proxy"""
+    import random
+
+    rng = random.Random(7)
+    weights = [1 / rank for rank in range(1, sites + 1)]  # Zipf-like popularity
+    workload = rng.choices([f"site{i}.com" for i in range(sites)], weights, k=requests)
+
+    for label, make in (("direct", lambda upstream: upstream),
+                        ("caching", lambda upstream: CachingProxyInternet(upstream, max_entries=sites // 2))):
+        upstream = SlowInternet(latency)
+        internet = make(upstream)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(workers) as pool:
+            list(pool.map(internet.connect_to, workload))
+        elapsed = time.perf_counter() - started
+        print(f"{label:>7}: {requests / elapsed:,.0f} req/sec, {upstream.calls} upstream calls")
+        if isinstance(internet, CachingProxyInternet):
+            print(f"         {internet.stats()}")
+
+
+def benchmark_blocklist(rules=1_000_000, lookups=200_000):
+    """Build time, memory and lookup throughput of a blocklist with many rules"""
+    import random
+    import tracemalloc
+
+    rng = random.Random(11)
+    domains = [f"{rng.getrandbits(40):x}.example{i % 1000}.com" for i in range(rules)]
+    hosts = [f"www.{rng.choice(domains)}" if i % 2 else f"cdn.{i}.allowed.org" for i in range(lookups)]
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    blocklist = DomainBlocklist(domains)
+    built = time.perf_counter() - started
+    blocklist_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    blocked = sum(blocklist.is_blocked(host) for host in hosts)
+    elapsed = time.perf_counter() - started
+    print(f"{len(blocklist):,} rules built in {built:.2f}s, {blocklist_bytes / len(blocklist):.1f} bytes/rule")
+    print(f"{lookups / elapsed:,.0f} lookups/sec ({blocked:,} of {lookups:,} blocked)")
+
+
 if __name__ == "__main__":
     internet = ProxyInternet()
 
@@ -32,6 +651,74 @@ if __name__ == "__main__":
     print(internet.connect_to("facebook.com"))  # ❌ Blocked
     print(internet.connect_to("twitter.com"))  # ❌ Blocked
     print(internet.connect_to("stackoverflow.com"))  # ✅ Allowed
+    print(internet.connect_to("www.facebook.com"))  # ❌ Blocked, subdomains match too
+    print(internet.connect_to("m.youtube.com"))  # ❌ Blocked
+
+    # Wildcard and exact rules
+    internet = ProxyInternet(DomainBlocklist(["*.ads.net", "=example.com"]))
+    print(internet.connect_to("tracker.ads.net"))  # ❌ Blocked by the wildcard
+    print(internet.connect_to("ads.net"))  # ✅ Allowed, the wildcard only matches subdomains
+    print(internet.connect_to("example.com"))  # ❌ Blocked by the exact rule
+    print(internet.connect_to("www.example.com"))  # ✅ Allowed
+
+    # Caching proxy in front of the access-control proxy
+    cached = CachingProxyInternet(ProxyInternet(), max_entries=2, ttl=30)
+    print(cached.connect_to("google.com"))  # Miss, forwarded
+    print(cached.connect_to("google.com"))  # Hit, served from the cache
+    print(cached.stats())
+
+    # Failures are cached for negative_ttl, so a dead site is not hammered
+    flaky = CachingProxyInternet(SlowInternet(failing={"down.com"}), negative_ttl=1)
+    for _ in range(2):
+        try:
+            flaky.connect_to("down.com")
+        except ConnectionError as error:
+            print(f"Failed: {error}")
+    print(f"Upstream calls for down.com: {flaky.internet.calls}")
+
+    # Rate limiting per client
+    limited = RateLimitingProxyInternet(limiter=TokenBucketRateLimiter(rate=1, capacity=2))
+    for _ in range(3):
+        print(limited.connect_to("google.com", client="alice"))  # Third request is denied
+    print(limited.connect_to("google.com", client="bob"))  # Every client gets its own bucket
+    print(limited.limiter.stats())
+
+    print("\nCaching proxy benchmark:")
+    benchmark_caching_proxy()
+
+    print("\nBlocklist benchmark:")
+    benchmark_blocklist()
+
+    print("\nRate limiter benchmark:")
+    benchmark_rate_limiter()
+
+    # Async proxy fanning requests out over pooled keep-alive connections
+    async def browse():
+        server = await start_stand_in_server()
+        port = server.sockets[0].getsockname()[1]
+        proxy = AsyncProxyInternet()
+        for response in await proxy.connect_many([f"127.0.0.1:{port}/", f"127.0.0.1:{port}/news", "youtube.com"]):
+            print(response)
+        proxy.real_internet.close()
+        server.close()
+        await server.wait_closed()
+
+    print()
+    asyncio.run(browse())
+
+    print("\nAsync proxy benchmark:")
+    benchmark_async_proxy()
+
+    # Virtual proxy: the subject is built on first use and released again when idle
+    lazy = VirtualProxy(RealInternet, idle_release=0.1)
+    print("\nInitialized before first call:", lazy.is_initialized)
+    print(lazy.connect_to("google.com"))
+    time.sleep(0.3)
+    print("Initialized after being idle:", lazy.is_initialized)
+    lazy.close()
+
+    print("\nVirtual proxy benchmark:")
+    benchmark_virtual_proxy()
 
 
 # The Proxy Pattern provides a placeholder for another object to control access to it.